@@ -37,12 +37,14 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'core',
     'rest_framework',
     'rest_framework.authtoken',
     'drf_spectacular',
     'user',
     'receipe',
+    'batch',
 ]
 
 MIDDLEWARE = [
@@ -92,6 +94,58 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+# Response cache generations and similarity index versions are invalidated
+# from the deletion worker and management commands, so every process must
+# use the same cache. The local memory default only suits a single process.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
+# Seconds a cached list response is kept (see core.response_cache).
+RESPONSE_CACHE_TIMEOUT = 300
+
+# Render receipe lists from .values() rows instead of model instances
+# (see receipe.serializers.ReceipeListFastSerializer).
+RECEIPE_FAST_LIST = os.environ.get('RECEIPE_FAST_LIST', '') == '1'
+
+# Receipes read per server-side cursor fetch when exporting.
+RECEIPE_EXPORT_CHUNK_SIZE = 2000
+
+# Largest list of receipes accepted by the bulk create endpoint.
+RECEIPE_BULK_MAX_ITEMS = 500
+
+# Requests allowed in one call to the batch API, and the paths they may use.
+BATCH_MAX_REQUESTS = 20
+BATCH_ALLOWED_PATHS = ['/api/receipe/', '/api/user/']
+
+# Rows removed per DELETE statement by background deletion jobs.
+DELETION_CHUNK_SIZE = 1000
+
+# Seconds a response is replayed for a repeated Idempotency-Key, and how
+# long a key stays locked while its first request runs.
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+IDEMPOTENCY_LOCK_TIMEOUT = 60
+
+# Most tags or ingredients returned by a ?q= autocomplete request.
+AUTOCOMPLETE_MAX_RESULTS = 10
+
+# Users whose similarity index is kept in memory, per process.
+SIMILARITY_INDEX_MAX_USERS = 64
+
+# Default and largest number of receipes returned as similar.
+SIMILAR_RECEIPES_DEFAULT = 10
+SIMILAR_RECEIPES_MAX = 50
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -142,8 +196,23 @@ AUTH_USER_MODEL = 'core.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'core.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.FastJSONParser',
+        'core.parsers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
 SPECTACULAR_SETTINGS = {
     'COMPONENT_SPLIT_REQUEST': True,
 }
+
+# Raise instead of logging when a view exceeds its query budget
+# (see core.query_budget.QueryBudgetMixin).
+QUERY_BUDGET_STRICT = DEBUG
@@ -32,6 +32,7 @@ urlpatterns = [
     ),
     path('api/user/', include('user.urls')),
     path('api/receipe/', include('receipe.urls')),
+    path('api/batch/', include('batch.urls')),
 ]
 
 if settings.DEBUG:
@@ -0,0 +1,68 @@
+"""
+Serializers for the batch API.
+"""
+from django.conf import settings
+from rest_framework import serializers
+
+METHODS = ['GET', 'POST', 'PUT', 'PATCH', 'DELETE']
+SAFE_METHODS = ['GET']
+
+
+class SubRequestSerializer(serializers.Serializer):
+    """Serializer for one request of a batch."""
+    method = serializers.ChoiceField(
+        choices=METHODS,
+        default='GET',
+    )
+    path = serializers.CharField(max_length=2048)
+    body = serializers.JSONField(required=False)
+
+    def validate_path(self, value):
+        """Only allow the API routes that can be batched."""
+        if not value.startswith(tuple(settings.BATCH_ALLOWED_PATHS)):
+            raise serializers.ValidationError(
+                'Only receipe and user API paths can be batched.'
+            )
+        return value
+
+
+class BatchSerializer(serializers.Serializer):
+    """Serializer for a batch of API requests."""
+    requests = SubRequestSerializer(many=True, allow_empty=False)
+    atomic = serializers.BooleanField(
+        default=False,
+        help_text='Run the read only requests in one transaction so they '
+                  'see the same snapshot of the data.',
+    )
+
+    def validate_requests(self, value):
+        """Limit the number of requests in a batch."""
+        max_requests = settings.BATCH_MAX_REQUESTS
+        if len(value) > max_requests:
+            raise serializers.ValidationError(
+                f'Ensure this list has no more than {max_requests} items.'
+            )
+        return value
+
+    def validate(self, attrs):
+        """Only read requests can share a read transaction."""
+        if attrs['atomic'] and any(
+            request['method'] not in SAFE_METHODS
+            for request in attrs['requests']
+        ):
+            raise serializers.ValidationError(
+                {'atomic': ['Atomic batches can only contain GET requests.']}
+            )
+        return attrs
+
+
+class SubResponseSerializer(serializers.Serializer):
+    """Serializer for the response to one request of a batch."""
+    status = serializers.IntegerField()
+    headers = serializers.DictField(child=serializers.CharField())
+    body = serializers.JSONField(allow_null=True)
+
+
+class BatchResponseSerializer(serializers.Serializer):
+    """Serializer for the responses to a batch, in request order."""
+    responses = SubResponseSerializer(many=True)
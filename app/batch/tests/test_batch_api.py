@@ -0,0 +1,214 @@
+"""
+Tests for the batch API.
+"""
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Receipe, Tag
+from receipe.views import ReceipeViewSet
+
+
+BATCH_URL = reverse('batch:batch')
+RECEIPES_PATH = reverse('receipe:receipe-list')
+TAGS_PATH = reverse('receipe:tag-list')
+ME_PATH = reverse('user:me')
+
+
+def detail_path(receipe_id):
+    """Create and return a receipe detail path."""
+    return reverse('receipe:receipe-detail', args=[receipe_id])
+
+
+def create_user(**params):
+    """Create and return a new user."""
+    return get_user_model().objects.create_user(**params)
+
+
+class PublicBatchApiTests(TestCase):
+    """Test unauthenticated batch requests."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_auth_required(self):
+        """Test auth is required to call the batch API."""
+        payload = {'requests': [{'path': ME_PATH}]}
+        res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateBatchApiTests(TestCase):
+    """Test authenticated batch requests."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='test123')
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.receipe = Receipe.objects.create(
+            user=self.user,
+            title='Sample receipe',
+            time_minutes=22,
+            price=Decimal('5.25'),
+        )
+        self.receipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+
+    def test_batch_reads(self):
+        """Test several reads are answered in order in one call."""
+        payload = {'requests': [
+            {'path': detail_path(self.receipe.id)},
+            {'path': TAGS_PATH},
+            {'path': ME_PATH},
+        ]}
+        res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        receipe, tags, me = res.data['responses']
+        self.assertEqual(receipe['status'], status.HTTP_200_OK)
+        self.assertEqual(receipe['body']['title'], 'Sample receipe')
+        self.assertIn('ETag', receipe['headers'])
+        self.assertEqual(tags['body']['results'][0]['name'], 'Vegan')
+        self.assertEqual(me['body']['email'], self.user.email)
+
+    def test_batch_authenticates_once(self):
+        """Test sub-requests reuse the batch's token lookup."""
+        payload = {'requests': [{'path': ME_PATH}] * 3}
+
+        with self.assertNumQueries(1):
+            res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(
+            [sub['status'] for sub in res.data['responses']],
+            [status.HTTP_200_OK] * 3,
+        )
+
+    def test_batch_sub_request_errors(self):
+        """Test failing sub-requests return their own status."""
+        other = create_user(email='other@example.com', password='test123')
+        receipe = Receipe.objects.create(
+            user=other,
+            title='Other receipe',
+            time_minutes=5,
+            price=Decimal('1.00'),
+        )
+        payload = {'requests': [
+            {'path': detail_path(receipe.id)},
+            {'path': '/api/receipe/unknown/'},
+            {'method': 'POST', 'path': RECEIPES_PATH, 'body': {}},
+        ]}
+        res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        statuses = [sub['status'] for sub in res.data['responses']]
+        self.assertEqual(statuses, [
+            status.HTTP_404_NOT_FOUND,
+            status.HTTP_404_NOT_FOUND,
+            status.HTTP_400_BAD_REQUEST,
+        ])
+        self.assertIn('title', res.data['responses'][2]['body'])
+
+    def test_batch_sub_request_exception(self):
+        """Test an entry raising returns a 500 and the others still run."""
+        payload = {'requests': [
+            {'path': RECEIPES_PATH},
+            {'path': ME_PATH},
+        ]}
+        with self.assertLogs('batch.views', level='ERROR'), patch.object(
+            ReceipeViewSet, 'list', side_effect=ValueError('Boom'),
+        ):
+            res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        failed, me = res.data['responses']
+        self.assertEqual(failed['status'],
+                         status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertEqual(me['status'], status.HTTP_200_OK)
+        self.assertEqual(me['body']['email'], self.user.email)
+
+    def test_atomic_batch_sub_request_exception(self):
+        """Test a failing entry leaves the atomic batch usable."""
+        payload = {
+            'atomic': True,
+            'requests': [
+                {'path': RECEIPES_PATH},
+                {'path': TAGS_PATH},
+            ],
+        }
+        with self.assertLogs('batch.views', level='ERROR'), patch.object(
+            ReceipeViewSet, 'list', side_effect=ValueError('Boom'),
+        ):
+            res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(
+            [sub['status'] for sub in res.data['responses']],
+            [status.HTTP_500_INTERNAL_SERVER_ERROR, status.HTTP_200_OK],
+        )
+
+    def test_batch_write(self):
+        """Test writes run as the authenticated user."""
+        payload = {'requests': [
+            {
+                'method': 'PATCH',
+                'path': detail_path(self.receipe.id),
+                'body': {'title': 'New title'},
+            },
+            {'path': detail_path(self.receipe.id)},
+        ]}
+        res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.receipe.refresh_from_db()
+        self.assertEqual(self.receipe.title, 'New title')
+        self.assertEqual(res.data['responses'][1]['body']['title'],
+                         'New title')
+
+    def test_batch_disallowed_path(self):
+        """Test only receipe and user paths can be batched."""
+        payload = {'requests': [{'path': BATCH_URL}]}
+        res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_atomic_batch_rejects_writes(self):
+        """Test atomic batches can only read."""
+        payload = {
+            'atomic': True,
+            'requests': [{'method': 'DELETE',
+                          'path': detail_path(self.receipe.id)}],
+        }
+        res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(Receipe.objects.filter(id=self.receipe.id).exists())
+
+    def test_atomic_batch_reads(self):
+        """Test atomic batches run their reads."""
+        payload = {
+            'atomic': True,
+            'requests': [{'path': RECEIPES_PATH}, {'path': TAGS_PATH}],
+        }
+        res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [sub['status'] for sub in res.data['responses']],
+            [status.HTTP_200_OK, status.HTTP_200_OK],
+        )
+
+    @override_settings(BATCH_MAX_REQUESTS=2)
+    def test_batch_limit(self):
+        """Test batches above the configured size are rejected."""
+        payload = {'requests': [{'path': ME_PATH}] * 3}
+        res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('requests', res.data)
@@ -0,0 +1,122 @@
+"""
+Views for the batch API.
+"""
+import io
+import json
+import logging
+from contextlib import nullcontext
+from urllib.parse import unquote_to_bytes
+
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connection, transaction
+from django.urls import Resolver404, resolve
+from drf_spectacular.utils import extend_schema
+from rest_framework import authentication, permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from batch.authentication import authenticate_as
+from batch.serializers import BatchSerializer, BatchResponseSerializer
+
+logger = logging.getLogger(__name__)
+
+RETURNED_HEADERS = ['ETag', 'Last-Modified', 'Location']
+
+
+class BatchView(APIView):
+    """
+    Run several API requests in one round trip
+    """
+    authentication_classes = [authentication.TokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def _sub_request(self, sub):
+        """
+        Build the request for one batch entry, authenticated as the batch
+        """
+        request = self.request
+        path, _, query = sub['path'].partition('?')
+        body = json.dumps(sub['body']).encode() if 'body' in sub else b''
+        environ = {
+            'REQUEST_METHOD': sub['method'],
+            'SCRIPT_NAME': request.META.get('SCRIPT_NAME', ''),
+            # WSGI paths are unquoted and latin-1 decoded.
+            'PATH_INFO': unquote_to_bytes(path).decode('iso-8859-1'),
+            'QUERY_STRING': query,
+            'SERVER_NAME': request.META.get('SERVER_NAME', 'localhost'),
+            'SERVER_PORT': str(request.META.get('SERVER_PORT', '80')),
+            'HTTP_HOST': request.get_host(),
+            'HTTP_ACCEPT': 'application/json',
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.url_scheme': request.scheme,
+            'wsgi.input': io.BytesIO(body),
+        }
+        sub_request = WSGIRequest(environ)
+        authenticate_as(sub_request, request)
+        return sub_request
+
+    def _run(self, sub, atomic=False):
+        """
+        Run one batch entry in-process and return its response
+        """
+        sub_request = self._sub_request(sub)
+        try:
+            match = resolve(sub_request.path_info)
+        except Resolver404:
+            return {
+                'status': status.HTTP_404_NOT_FOUND,
+                'headers': {},
+                'body': {'detail': 'Not found.'},
+            }
+
+        try:
+            # A savepoint keeps a failed entry from aborting the shared
+            # transaction of the others.
+            with transaction.atomic() if atomic else nullcontext():
+                response = match.func(sub_request, *match.args, **match.kwargs)
+        except Exception:
+            logger.exception('Batch request %s %s failed',
+                             sub['method'], sub['path'])
+            return {
+                'status': status.HTTP_500_INTERNAL_SERVER_ERROR,
+                'headers': {},
+                'body': {'detail': 'A server error occurred.'},
+            }
+
+        return {
+            'status': response.status_code,
+            'headers': {
+                name: response[name]
+                for name in RETURNED_HEADERS if response.has_header(name)
+            },
+            'body': getattr(response, 'data', None),
+        }
+
+    def _run_all(self, subs, atomic):
+        """
+        Run the batch entries, optionally in one read only transaction
+        """
+        if not atomic:
+            return [self._run(sub) for sub in subs]
+
+        outermost = not connection.in_atomic_block
+        with transaction.atomic():
+            if outermost and connection.vendor == 'postgresql':
+                # Must run before any other query of the transaction.
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        'SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, '
+                        'READ ONLY'
+                    )
+            return [self._run(sub, atomic=True) for sub in subs]
+
+    @extend_schema(request=BatchSerializer, responses=BatchResponseSerializer)
+    def post(self, request):
+        """Run the requests of a batch in order and return every response."""
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        responses = self._run_all(data['requests'], data['atomic'])
+        return Response({'responses': responses})
@@ -50,3 +50,4 @@ admin.site.register(models.User, UserAdmin)
 admin.site.register(models.Receipe)
 admin.site.register(models.Tag)
 admin.site.register(models.Ingredient)
+admin.site.register(models.DeletionJob)
@@ -0,0 +1,118 @@
+"""
+Conditional GET support (ETag / Last-Modified) for API views
+"""
+import hashlib
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+class ConditionalGetMixin:
+    """
+    Base for answering requests with 304 Not Modified when the client
+    already holds the current representation.
+
+    Validators come from the `modified_at` column of the queryset: a single
+    COUNT/MAX aggregate for lists and a single column lookup for details, so
+    nothing is serialized when the client is up to date. Lists are only
+    validated by ETag, as removing a row leaves MAX(modified_at) unchanged.
+    """
+    modified_field = 'modified_at'
+
+    def _make_etag(self, *parts):
+        """
+        Hash the request and the validator parts into an entity tag
+        """
+        request = self.request
+        key = '|'.join(str(part) for part in (
+            request.get_full_path(),
+            request.accepted_media_type,
+            request.user.pk,
+            *parts,
+        ))
+        return hashlib.md5(key.encode()).hexdigest()
+
+    def get_list_validators(self):
+        """
+        Return the (etag, last modified) of the current list.
+
+        The row count in the ETag catches deletions. There is no Last-Modified,
+        since If-Modified-Since alone would miss them.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        stats = queryset.order_by().aggregate(
+            rows=Count('pk'),
+            last_modified=Max(self.modified_field),
+        )
+        return (
+            self._make_etag(stats['rows'], stats['last_modified']),
+            None,
+        )
+
+    def get_object_validators(self):
+        """
+        Return the (etag, last modified) of the requested object.
+
+        Lookups that can't match, like a non-numeric pk, return no
+        validators so retrieve() answers with its own 404.
+        """
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            last_modified = self.get_queryset().filter(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            ).values_list(self.modified_field, flat=True).first()
+        except (TypeError, ValueError, ValidationError):
+            return None, None
+        if last_modified is None:
+            return None, None
+
+        return self._make_etag(last_modified), last_modified
+
+    def _conditional(self, validators, handler, request, *args, **kwargs):
+        """
+        Return 304 for fresh clients, otherwise run handler and tag it
+        """
+        etag, last_modified = validators
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        if etag is not None:
+            not_modified = get_conditional_response(
+                request,
+                etag=quote_etag(etag),
+                last_modified=timestamp,
+            )
+            if not_modified is not None:
+                return not_modified
+
+        response = handler(request, *args, **kwargs)
+        if etag is not None and response.status_code == 200:
+            response['ETag'] = quote_etag(etag)
+            if timestamp is not None:
+                response['Last-Modified'] = http_date(timestamp)
+
+        return response
+
+
+class ConditionalListMixin(ConditionalGetMixin):
+    """
+    Conditional GET for the list action
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional(
+            self.get_list_validators(),
+            super().list, request, *args, **kwargs
+        )
+
+
+class ConditionalRetrieveMixin(ConditionalGetMixin):
+    """
+    Conditional GET for the retrieve action
+    """
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional(
+            self.get_object_validators(),
+            super().retrieve, request, *args, **kwargs
+        )
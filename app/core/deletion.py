@@ -0,0 +1,94 @@
+"""
+Chunked deletion of accounts and receipes for background jobs
+"""
+import logging
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from core import similarity
+from core.models import DeletionJob, Receipe, Tag, Ingredient
+from core.response_cache import bump_generation
+from receipe.filters import RECEIPE_RELATIONS, receipe_links
+
+logger = logging.getLogger(__name__)
+
+
+def delete_in_chunks(queryset, chunk_size=None):
+    """
+    Delete the rows of queryset a chunk of primary keys at a time.
+
+    Each chunk is one raw DELETE in its own transaction, so locks are held
+    briefly and no rows are loaded into memory. Raw deletes skip signals
+    and cascades: callers delete dependent rows first. Returns the number
+    of rows deleted.
+    """
+    chunk_size = chunk_size or settings.DELETION_CHUNK_SIZE
+    model = queryset.model
+    deleted = 0
+    while True:
+        pks = list(
+            queryset.order_by('pk').values_list('pk', flat=True)[:chunk_size]
+        )
+        if not pks:
+            return deleted
+
+        with transaction.atomic():
+            chunk = model.objects.filter(pk__in=pks)
+            deleted += chunk._raw_delete(chunk.db)
+
+
+def delete_receipes(receipes, chunk_size=None):
+    """
+    Delete receipes and their tag and ingredient links in chunks
+    """
+    deleted = 0
+    for model in RECEIPE_RELATIONS:
+        through, column = receipe_links(model)
+        deleted += delete_in_chunks(
+            through.objects.filter(receipe__in=receipes), chunk_size,
+        )
+
+    return deleted + delete_in_chunks(receipes, chunk_size)
+
+
+def run_deletion_job(job, chunk_size=None):
+    """
+    Run a deletion job to completion, recording its progress
+    """
+    user_id = job.user_id
+    job.status = DeletionJob.STATUS_RUNNING
+    job.save(update_fields=['status'])
+
+    try:
+        if job.kind == DeletionJob.KIND_RECEIPES:
+            receipes = Receipe.objects.filter(
+                user_id=user_id, id__in=job.receipe_ids,
+            )
+            job.deleted = delete_receipes(receipes, chunk_size)
+        else:
+            receipes = Receipe.objects.filter(user_id=user_id)
+            job.deleted = delete_receipes(receipes, chunk_size)
+            for model in [Tag, Ingredient]:
+                job.deleted += delete_in_chunks(
+                    model.objects.filter(user_id=user_id), chunk_size,
+                )
+            # Only small related rows are left for the collector.
+            get_user_model().objects.filter(id=user_id).delete()
+            job.user = None
+            job.deleted += 1
+    except Exception as e:
+        logger.exception('Deletion job %s failed', job.pk)
+        job.status = DeletionJob.STATUS_FAILED
+        job.error = str(e)
+    else:
+        job.status = DeletionJob.STATUS_DONE
+    finally:
+        job.finished_at = timezone.now()
+        job.save()
+        bump_generation(user_id)
+        similarity.invalidate(user_id)
+
+    return job
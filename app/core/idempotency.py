@@ -0,0 +1,159 @@
+"""
+Idempotency-Key support for API writes
+"""
+import functools
+import hashlib
+import json
+
+import orjson
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import UploadedFile
+from django.utils.crypto import salted_hmac
+from drf_spectacular.utils import OpenApiParameter, OpenApiTypes
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from core.renderers import FastJSONRenderer
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+STORED_HEADERS = ['Location']
+MAX_KEY_LENGTH = 255
+
+IDEMPOTENCY_PARAMETER = OpenApiParameter(
+    IDEMPOTENCY_HEADER,
+    OpenApiTypes.STR,
+    OpenApiParameter.HEADER,
+    description='Unique key making retries of this request safe',
+)
+
+# Stored while the first request is running, so concurrent retries are
+# rejected instead of doing the work twice.
+IN_PROGRESS = 'in-progress'
+
+
+def _describe(value):
+    """
+    Describe values json can't encode, such as uploaded files
+    """
+    if isinstance(value, UploadedFile):
+        return f'{value.name}:{value.size}'
+    return str(value)
+
+
+def request_fingerprint(request):
+    """
+    Return a digest of the method, path and parsed payload of a request.
+
+    The payload can hold secrets, like a sign up password, so the digest is
+    an HMAC keyed with SECRET_KEY that can't be brute forced from the cache.
+    """
+    data = request.data
+    if hasattr(data, 'lists'):
+        data = sorted(data.lists())
+    payload = json.dumps(
+        [request.method, request.path, data],
+        sort_keys=True,
+        default=_describe,
+    )
+    return salted_hmac(
+        'core.idempotency', payload, algorithm='sha256',
+    ).digest()
+
+
+def _cache_key(view, request, key, fingerprint):
+    digest = hashlib.sha256(key.encode()).hexdigest()
+    if request.user.is_authenticated:
+        scope = request.user.pk
+    else:
+        # Anonymous clients, such as sign ups, share no identity. Scoping
+        # by the request keeps one client from replaying another's.
+        scope = f'anonymous:{fingerprint.hex()}'
+    return f'idempotency:{view.__class__.__name__}:{scope}:{digest}'
+
+
+def idempotent(method):
+    """
+    Replay the stored response of view method for a repeated key.
+
+    Requests carrying an Idempotency-Key header run once per user and key
+    within IDEMPOTENCY_KEY_TTL, or once per payload and key for anonymous
+    requests. Retries get the first response back with an
+    Idempotent-Replayed header. A retry still in flight gets a 409, and
+    reusing a key for a different payload gets a 422. Server errors are not
+    stored, so they can be retried.
+    """
+    @functools.wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return method(self, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            raise ValidationError({IDEMPOTENCY_HEADER: [
+                f'Ensure this value has at most {MAX_KEY_LENGTH} characters.'
+            ]})
+
+        fingerprint = request_fingerprint(request)
+        cache_key = _cache_key(self, request, key, fingerprint)
+        if not cache.add(
+            cache_key,
+            (fingerprint, IN_PROGRESS),
+            settings.IDEMPOTENCY_LOCK_TIMEOUT,
+        ):
+            return _replay(cache.get(cache_key), fingerprint)
+
+        try:
+            response = method(self, request, *args, **kwargs)
+        except Exception:
+            cache.delete(cache_key)
+            raise
+
+        if response.status_code >= 500:
+            cache.delete(cache_key)
+            return response
+
+        cache.set(cache_key, (
+            fingerprint,
+            response.status_code,
+            FastJSONRenderer().render(response.data),
+            {
+                name: response[name]
+                for name in STORED_HEADERS if response.has_header(name)
+            },
+        ), settings.IDEMPOTENCY_KEY_TTL)
+
+        return response
+
+    return wrapper
+
+
+def _replay(stored, fingerprint):
+    """
+    Build the response to a retried request from what was stored
+    """
+    if stored is None:
+        # Expired between the add and the get.
+        return Response(
+            {'detail': 'Request is being processed, retry later.'},
+            status=status.HTTP_409_CONFLICT,
+        )
+    if stored[0] != fingerprint:
+        return Response(
+            {'detail': f'{IDEMPOTENCY_HEADER} was already used for a '
+                       'different request.'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    if stored[1] == IN_PROGRESS:
+        return Response(
+            {'detail': 'Request is being processed, retry later.'},
+            status=status.HTTP_409_CONFLICT,
+        )
+
+    _, status_code, body, headers = stored
+    return Response(
+        orjson.loads(body),
+        status=status_code,
+        headers={**headers, REPLAYED_HEADER: 'true'},
+    )
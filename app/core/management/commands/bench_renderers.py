@@ -0,0 +1,82 @@
+"""
+Django command to benchmark the API renderers on a receipe list payload
+"""
+import timeit
+from collections import OrderedDict
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from core.renderers import FastJSONRenderer, MessagePackRenderer
+
+
+def build_payload(count, coerce_decimal=True):
+    """
+    Return a paginated receipe list payload shaped like the API output
+    """
+    results = []
+    for i in range(count):
+        price = Decimal(f'{i % 100}.{i % 100:02d}')
+        results.append(OrderedDict([
+            ('id', i),
+            ('title', f'Receipe {i} – slow cooked'),
+            ('time_minutes', i % 120),
+            ('price', str(price) if coerce_decimal else price),
+            ('link', f'https://example.com/receipes/{i}.pdf'),
+            ('tags', [
+                OrderedDict([('id', t), ('name', f'Tag {t}')])
+                for t in range(i % 4)
+            ]),
+            ('ingredients', [
+                OrderedDict([('id', n), ('name', f'Ingredient {n}')])
+                for n in range(i % 8)
+            ]),
+        ]))
+
+    return OrderedDict([
+        ('next', 'https://example.com/api/receipe/receipes/?cursor=cD0x'),
+        ('previous', None),
+        ('results', results),
+    ])
+
+
+class Command(BaseCommand):
+    """
+    Django command to compare renderer throughput
+    """
+    help = 'Benchmark JSON and MessagePack renderers on a receipe list.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--receipes', type=int, default=1000)
+        parser.add_argument('--iterations', type=int, default=50)
+
+    def handle(self, *args, **options):
+        """
+        Entry point for Command.
+        """
+        renderers = [
+            ('JSONRenderer (current)', JSONRenderer()),
+            ('FastJSONRenderer', FastJSONRenderer()),
+            ('MessagePackRenderer', MessagePackRenderer()),
+        ]
+        iterations = options['iterations']
+
+        for label, coerce in [('string prices', True),
+                              ('Decimal prices', False)]:
+            payload = build_payload(options['receipes'], coerce)
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{options["receipes"]} receipes, {label}'
+            ))
+            baseline = None
+            for name, renderer in renderers:
+                seconds = timeit.timeit(
+                    lambda: renderer.render(payload, renderer.media_type),
+                    number=iterations,
+                ) / iterations
+                baseline = baseline or seconds
+                size = len(renderer.render(payload, renderer.media_type))
+                self.stdout.write(
+                    f'  {name:<24} {seconds * 1000:8.3f} ms  '
+                    f'{baseline / seconds:5.1f}x  {size:>8} bytes'
+                )
@@ -0,0 +1,103 @@
+"""
+Django command to print the query plans behind the receipe API endpoints
+"""
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.http import HttpRequest, QueryDict
+from rest_framework.request import Request
+
+from core.models import Receipe, Tag, Ingredient
+from receipe import views
+
+
+class Command(BaseCommand):
+    """
+    Django command to EXPLAIN the list and detail queries of a user
+    """
+    help = (
+        'Print the query plan of every receipe API list and detail query '
+        'for the given user.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('email', help='Email of the user to explain as')
+        parser.add_argument(
+            '--analyze',
+            action='store_true',
+            help='Run EXPLAIN ANALYZE (PostgreSQL only)',
+        )
+
+    def _endpoints(self, user):
+        """
+        Return (label, viewset, action, query params) for each endpoint
+        """
+        receipe_id = Receipe.objects.filter(user=user).values_list(
+            'id', flat=True,
+        ).first()
+        tag_ids = list(
+            Tag.objects.filter(user=user).values_list('id', flat=True)[:2]
+        )
+        ingredient_ids = list(
+            Ingredient.objects.filter(user=user)
+            .values_list('id', flat=True)[:2]
+        )
+        tags = ','.join(str(pk) for pk in tag_ids)
+        ingredients = ','.join(str(pk) for pk in ingredient_ids)
+
+        return [
+            ('receipe list', views.ReceipeViewSet, 'list', {}),
+            ('receipe list ?tags=', views.ReceipeViewSet, 'list',
+             {'tags': tags}),
+            ('receipe list ?ingredients=&ingredients_mode=all',
+             views.ReceipeViewSet, 'list',
+             {'ingredients': ingredients, 'ingredients_mode': 'all'}),
+            ('receipe detail', views.ReceipeViewSet, 'retrieve',
+             {'pk': receipe_id}),
+            ('tag list', views.TagViewSet, 'list', {}),
+            ('tag list ?assigned_only=1', views.TagViewSet, 'list',
+             {'assigned_only': '1'}),
+            ('ingredient list', views.IngredientViewSet, 'list', {}),
+            ('ingredient list ?assigned_only=1', views.IngredientViewSet,
+             'list', {'assigned_only': '1'}),
+        ]
+
+    def _queryset(self, user, viewset, action, params):
+        """
+        Build the queryset the endpoint would run for user
+        """
+        http_request = HttpRequest()
+        http_request.method = 'GET'
+        http_request.GET = QueryDict(mutable=True)
+        http_request.GET.update({k: v for k, v in params.items() if v})
+        request = Request(http_request)
+        request.user = user
+
+        view = viewset(request=request, action=action, format_kwarg=None)
+        queryset = view.get_queryset()
+        if action == 'retrieve':
+            return queryset.filter(pk=params['pk'])
+
+        paginator = view.paginator
+        return queryset.order_by(paginator.ordering)[:paginator.page_size]
+
+    def handle(self, *args, **options):
+        """
+        Entry point for Command.
+        """
+        try:
+            user = get_user_model().objects.get(email=options['email'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'No user with email {options["email"]}')
+
+        explain_options = {}
+        if options['analyze']:
+            if connection.vendor != 'postgresql':
+                raise CommandError('--analyze requires PostgreSQL')
+            explain_options = {'analyze': True, 'buffers': True}
+
+        for label, viewset, action, params in self._endpoints(user):
+            queryset = self._queryset(user, viewset, action, params)
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            self.stdout.write(queryset.explain(**explain_options))
+            self.stdout.write('')
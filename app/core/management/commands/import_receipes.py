@@ -0,0 +1,307 @@
+"""
+Django command to bulk load receipes from NDJSON or CSV with COPY
+"""
+import csv
+import io
+import json
+import os
+import sys
+import time
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core import similarity
+from core.models import Receipe, Tag, Ingredient
+from core.response_cache import bump_generation, cache_is_shared
+from receipe.filters import receipe_links
+
+RELATIONS = {'tags': Tag, 'ingredients': Ingredient}
+RECEIPE_COLUMNS = [
+    'id', 'user_id', 'title', 'description', 'time_minutes', 'price',
+    'link', 'modified_at',
+]
+PRICE_LIMIT = Decimal('1000')
+
+
+def read_records(stream, fmt):
+    """
+    Yield one dict per receipe from an NDJSON or CSV stream.
+
+    Both formats match the receipe export: NDJSON tags and ingredients are
+    lists of names or {"name": ...} objects, CSV ones are | separated.
+    """
+    if fmt == 'csv':
+        for row in csv.DictReader(stream):
+            for name in RELATIONS:
+                row[name] = (row.get(name) or '').split('|')
+            yield row
+        return
+
+    for line in stream:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        for name in RELATIONS:
+            record[name] = [
+                item['name'] if isinstance(item, dict) else item
+                for item in record.get(name) or []
+            ]
+        yield record
+
+
+def clean_record(record):
+    """
+    Return the receipe columns and relation names of a record.
+
+    Raises ValueError describing the first invalid value.
+    """
+    title = (record.get('title') or '').strip()
+    if not title or len(title) > 255:
+        raise ValueError('title must be 1 to 255 characters')
+
+    try:
+        time_minutes = int(record.get('time_minutes'))
+    except (TypeError, ValueError):
+        raise ValueError('time_minutes must be an integer')
+
+    try:
+        price = Decimal(str(record.get('price'))).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        raise ValueError('price must be a decimal number')
+    if abs(price) >= PRICE_LIMIT:
+        raise ValueError('price must be below 1000')
+
+    link = record.get('link') or ''
+    if len(link) > 255:
+        raise ValueError('link must be at most 255 characters')
+
+    cleaned = {
+        'title': title,
+        'description': record.get('description') or '',
+        'time_minutes': time_minutes,
+        'price': price,
+        'link': link,
+    }
+    for name in RELATIONS:
+        names = [str(item).strip() for item in record.get(name) or []]
+        if any(len(item) > 255 for item in names):
+            raise ValueError(f'{name} names must be at most 255 characters')
+        cleaned[name] = list(dict.fromkeys(item for item in names if item))
+
+    return cleaned
+
+
+class NameCache:
+    """
+    In-memory map of a user's tag or ingredient names to ids, creating
+    names it has not seen before once per batch
+    """
+    def __init__(self, model, user):
+        self.model = model
+        self.user = user
+        self.ids = dict(
+            model.objects.filter(user=user).values_list('name', 'id')
+        )
+
+    def resolve(self, names):
+        """Make sure every name has an id."""
+        missing = set(names) - self.ids.keys()
+        if not missing:
+            return
+
+        self.ids.update(
+            (obj.name, obj.id)
+            for obj in self.model.objects.get_or_create_names(
+                self.user, missing,
+            )
+        )
+
+
+def copy_rows(cursor, table, columns, rows):
+    """
+    Load rows into table with a single COPY FROM STDIN
+    """
+    buffer = io.StringIO()
+    # Quote everything so empty strings are not read back as NULL.
+    csv.writer(buffer, quoting=csv.QUOTE_ALL).writerows(rows)
+    buffer.seek(0)
+    cursor.copy_expert(
+        f'COPY {table} ({", ".join(columns)}) FROM STDIN WITH (FORMAT csv)',
+        buffer,
+    )
+
+
+class Command(BaseCommand):
+    """
+    Django command to import receipes for a user using PostgreSQL COPY
+    """
+    help = (
+        'Import receipes for the given user from an NDJSON or CSV file, '
+        'in the format written by the receipe export.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('email', help='Email of the user to import for')
+        parser.add_argument('path', help='File to import, or - for stdin')
+        parser.add_argument(
+            '--format',
+            choices=['ndjson', 'csv'],
+            help='Input format, guessed from the file extension by default',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10000,
+            help='Receipes loaded per COPY and transaction',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='File recording committed progress, used to resume',
+        )
+
+    def _read_checkpoint(self, path, source):
+        """
+        Return the number of records already imported from source
+        """
+        if not path or not os.path.exists(path):
+            return 0
+
+        with open(path) as f:
+            checkpoint = json.load(f)
+        if checkpoint['source'] != source:
+            raise CommandError(
+                f'Checkpoint {path} belongs to {checkpoint["source"]}'
+            )
+        return checkpoint['records']
+
+    def _write_checkpoint(self, path, source, records):
+        """
+        Atomically record that the first records of source are imported
+        """
+        if not path:
+            return
+
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'source': source, 'records': records}, f)
+        os.replace(tmp_path, path)
+
+    def _reserve_ids(self, cursor, count):
+        """
+        Take count ids from the receipe primary key sequence
+        """
+        cursor.execute(
+            "SELECT nextval(pg_get_serial_sequence(%s, 'id')) "
+            'FROM generate_series(1, %s)',
+            [Receipe._meta.db_table, count],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+    def _load_batch(self, user, records, caches, start):
+        """
+        Load one batch of records in a transaction
+        """
+        cleaned = []
+        for offset, record in enumerate(records, start=start + 1):
+            try:
+                cleaned.append(clean_record(record))
+            except ValueError as e:
+                raise CommandError(f'Record {offset}: {e}')
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            for name, cache in caches.items():
+                cache.resolve(
+                    item for receipe in cleaned for item in receipe[name]
+                )
+
+            ids = self._reserve_ids(cursor, len(cleaned))
+            modified_at = timezone.now()
+            copy_rows(cursor, Receipe._meta.db_table, RECEIPE_COLUMNS, [
+                [
+                    receipe_id, user.id, receipe['title'],
+                    receipe['description'], receipe['time_minutes'],
+                    receipe['price'], receipe['link'], modified_at,
+                ]
+                for receipe_id, receipe in zip(ids, cleaned)
+            ])
+
+            for name, model in RELATIONS.items():
+                through, column = receipe_links(model)
+                name_ids = caches[name].ids
+                copy_rows(cursor, through._meta.db_table, [
+                    'receipe_id', column,
+                ], [
+                    [receipe_id, name_ids[item]]
+                    for receipe_id, receipe in zip(ids, cleaned)
+                    for item in receipe[name]
+                ])
+
+    def handle(self, *args, **options):
+        """
+        Entry point for Command.
+        """
+        if connection.vendor != 'postgresql':
+            raise CommandError('import_receipes requires PostgreSQL')
+
+        try:
+            user = get_user_model().objects.get(email=options['email'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'No user with email {options["email"]}')
+
+        if not cache_is_shared():
+            self.stderr.write(self.style.WARNING(
+                'The cache is local to this process, cached lists and '
+                'similar receipes will miss the import until they time '
+                'out. Set CACHE_BACKEND to a cache shared with the app '
+                'server.'
+            ))
+
+        path = options['path']
+        fmt = options['format'] or (
+            'csv' if path.lower().endswith('.csv') else 'ndjson'
+        )
+        source = path if path == '-' else os.path.abspath(path)
+        batch_size = options['batch_size']
+        checkpoint = options['checkpoint']
+
+        done = self._read_checkpoint(checkpoint, source)
+        if done:
+            self.stdout.write(f'Resuming after {done} receipes')
+
+        caches = {
+            name: NameCache(model, user) for name, model in RELATIONS.items()
+        }
+        stream = sys.stdin if path == '-' else open(path, newline='')
+        imported = 0
+        started = time.monotonic()
+        try:
+            records = islice(read_records(stream, fmt), done, None)
+            while True:
+                batch = list(islice(records, batch_size))
+                if not batch:
+                    break
+
+                self._load_batch(user, batch, caches, done)
+                done += len(batch)
+                imported += len(batch)
+                self._write_checkpoint(checkpoint, source, done)
+
+                rate = imported / max(time.monotonic() - started, 1e-9)
+                self.stdout.write(
+                    f'{done} receipes imported ({rate:.0f} receipes/s)'
+                )
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        if imported:
+            bump_generation(user.id)
+            similarity.invalidate(user.id)
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported} receipes for {user.email}'
+        ))
@@ -0,0 +1,72 @@
+"""
+Django command to run pending deletion jobs
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.deletion import run_deletion_job
+from core.models import DeletionJob
+from core.response_cache import cache_is_shared
+
+
+class Command(BaseCommand):
+    """
+    Django command to process deletion jobs in the background
+    """
+    help = 'Run pending account and receipe deletion jobs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit once no job is pending instead of polling',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5,
+            help='Seconds to wait between polls when idle',
+        )
+
+    def _claim_job(self):
+        """
+        Mark the oldest pending job as running and return it, if any
+        """
+        with transaction.atomic():
+            job = DeletionJob.objects.select_for_update(
+                skip_locked=True,
+            ).filter(
+                status=DeletionJob.STATUS_PENDING,
+            ).order_by('id').first()
+            if job is not None:
+                job.status = DeletionJob.STATUS_RUNNING
+                job.save(update_fields=['status'])
+
+        return job
+
+    def handle(self, *args, **options):
+        """
+        Entry point for Command.
+        """
+        if not cache_is_shared():
+            self.stderr.write(self.style.WARNING(
+                'The cache is local to this process, cached responses of '
+                'deleted data are kept until they time out. Set '
+                'CACHE_BACKEND to a cache shared with the app server.'
+            ))
+
+        while True:
+            job = self._claim_job()
+            if job is None:
+                if options['once']:
+                    return
+                time.sleep(options['interval'])
+                continue
+
+            job = run_deletion_job(job)
+            self.stdout.write(
+                f'Deletion job {job.pk}: {job.status}, '
+                f'{job.deleted} rows deleted'
+            )
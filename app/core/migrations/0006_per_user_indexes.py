@@ -0,0 +1,81 @@
+# Generated by Django 3.2.25 on 2026-10-18 19:12
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_names(apps, schema_editor):
+    """
+    Merge tags and ingredients sharing a (user, name) into the oldest row,
+    repointing their receipe links, so the unique constraints can be added.
+    """
+    Receipe = apps.get_model('core', 'Receipe')
+
+    for field, column in [('tags', 'tag_id'), ('ingredients', 'ingredient_id')]:
+        through = getattr(Receipe, field).through
+        model = Receipe._meta.get_field(field).related_model
+        duplicates = (
+            model.objects.values('user_id', 'name')
+            .annotate(keep_id=Min('id'), rows=Count('id'))
+            .filter(rows__gt=1)
+        )
+
+        for group in duplicates:
+            keep_id = group['keep_id']
+            extra_ids = list(
+                model.objects.filter(
+                    user_id=group['user_id'],
+                    name=group['name'],
+                ).exclude(id=keep_id).values_list('id', flat=True)
+            )
+            linked = set(
+                through.objects.filter(
+                    **{f'{column}__in': extra_ids}
+                ).values_list('receipe_id', flat=True)
+            )
+            already = set(
+                through.objects.filter(
+                    **{column: keep_id, 'receipe_id__in': linked}
+                ).values_list('receipe_id', flat=True)
+            )
+            through.objects.filter(**{f'{column}__in': extra_ids}).delete()
+            through.objects.bulk_create([
+                through(receipe_id=receipe_id, **{column: keep_id})
+                for receipe_id in linked - already
+            ])
+            model.objects.filter(id__in=extra_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_receipe_image'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_names, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='receipe',
+            index=models.Index(fields=['user', 'id'], name='receipe_user_id_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('user', 'name'), name='unique_ingredient_user_name'),
+        ),
+        migrations.AddConstraint(
+            model_name='tag',
+            constraint=models.UniqueConstraint(fields=('user', 'name'), name='unique_tag_user_name'),
+        ),
+        # Reverse (attribute, receipe) indexes on the auto-created through
+        # tables, used by assigned_only and by per-attribute lookups.
+        migrations.RunSQL(
+            'CREATE INDEX core_receipe_tags_tag_receipe_idx '
+            'ON core_receipe_tags (tag_id, receipe_id);',
+            'DROP INDEX core_receipe_tags_tag_receipe_idx;',
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX core_receipe_ingredients_ingredient_receipe_idx '
+            'ON core_receipe_ingredients (ingredient_id, receipe_id);',
+            'DROP INDEX core_receipe_ingredients_ingredient_receipe_idx;',
+        ),
+    ]
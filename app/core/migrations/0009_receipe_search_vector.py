@@ -0,0 +1,112 @@
+# Generated by Django 3.2.25 on 2026-10-18 19:40
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+BACKFILL_BATCH_SIZE = 10000
+
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('pg_catalog.english', "
+    "coalesce({row}title, '')), 'A') || "
+    "setweight(to_tsvector('pg_catalog.english', "
+    "coalesce({row}description, '')), 'B')"
+)
+
+
+def create_search_trigger(apps, schema_editor):
+    """
+    Maintain search_vector with a trigger, so COPY and bulk inserts that
+    skip Django signals are indexed too, and fill it for existing rows
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    schema_editor.execute(f'''
+        CREATE FUNCTION core_receipe_search_vector_update()
+        RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector := {SEARCH_VECTOR_SQL.format(row='NEW.')};
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql;
+    ''')
+    schema_editor.execute('''
+        CREATE TRIGGER core_receipe_search_vector_trigger
+        BEFORE INSERT OR UPDATE OF title, description ON core_receipe
+        FOR EACH ROW EXECUTE FUNCTION core_receipe_search_vector_update();
+    ''')
+
+    # Backfill in id ranges, each committed on its own, to keep locks and
+    # WAL bursts bounded on large tables.
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('SELECT min(id), max(id) FROM core_receipe')
+        first, last = cursor.fetchone()
+        if first is None:
+            return
+        for start in range(first, last + 1, BACKFILL_BATCH_SIZE):
+            cursor.execute(
+                'UPDATE core_receipe SET search_vector = '
+                f'{SEARCH_VECTOR_SQL.format(row="")} '
+                'WHERE id >= %s AND id < %s',
+                [start, start + BACKFILL_BATCH_SIZE],
+            )
+
+
+def drop_search_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    schema_editor.execute(
+        'DROP TRIGGER core_receipe_search_vector_trigger ON core_receipe;'
+    )
+    schema_editor.execute('DROP FUNCTION core_receipe_search_vector_update();')
+
+
+def create_search_index(apps, schema_editor):
+    """
+    Build the GIN index without blocking writes (PostgreSQL only)
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    schema_editor.execute(
+        'CREATE INDEX CONCURRENTLY receipe_search_vector_idx '
+        'ON core_receipe USING gin (search_vector);'
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    schema_editor.execute('DROP INDEX CONCURRENTLY receipe_search_vector_idx;')
+
+
+class Migration(migrations.Migration):
+    # Needed for the batched backfill and CREATE INDEX CONCURRENTLY.
+    atomic = False
+
+    dependencies = [
+        ('core', '0008_deletion_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='receipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_trigger, drop_search_trigger),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='receipe',
+                    index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='receipe_search_vector_idx'),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(create_search_index, drop_search_index),
+            ],
+        ),
+    ]
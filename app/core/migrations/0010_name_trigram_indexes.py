@@ -0,0 +1,48 @@
+# Generated by Django 3.2.25 on 2026-10-18 19:45
+
+from django.db import migrations
+
+TABLES = ['core_tag', 'core_ingredient']
+
+
+def create_trigram_indexes(apps, schema_editor):
+    """
+    Index UPPER(name) with pg_trgm for tag and ingredient autocomplete.
+
+    Serves both UPPER(name) LIKE 'PREFIX%' (name__istartswith) and trigram
+    similarity. Expression indexes with an operator class can't be
+    declared on the models in this Django version, so the index only
+    exists in the database (PostgreSQL only).
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm;')
+    for table in TABLES:
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY {table}_name_trgm_idx '
+            f'ON {table} USING gin (UPPER(name) gin_trgm_ops);'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    for table in TABLES:
+        schema_editor.execute(
+            f'DROP INDEX CONCURRENTLY {table}_name_trgm_idx;'
+        )
+
+
+class Migration(migrations.Migration):
+    # Needed for CREATE INDEX CONCURRENTLY.
+    atomic = False
+
+    dependencies = [
+        ('core', '0009_receipe_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.2.25 on 2026-10-18 19:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_name_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='receipe',
+            index=models.Index(fields=['user', 'time_minutes', 'id'], name='receipe_user_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='receipe',
+            index=models.Index(fields=['user', 'price', 'id'], name='receipe_user_price_idx'),
+        ),
+    ]
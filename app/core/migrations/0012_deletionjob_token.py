@@ -0,0 +1,34 @@
+# Generated by Django 3.2.25 on 2026-10-18 20:40
+
+import uuid
+
+from django.db import migrations, models
+
+
+def fill_tokens(apps, schema_editor):
+    """Give every existing job a distinct token."""
+    DeletionJob = apps.get_model('core', 'DeletionJob')
+    for job in DeletionJob.objects.filter(token__isnull=True).only('id'):
+        job.token = uuid.uuid4()
+        job.save(update_fields=['token'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_receipe_range_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deletionjob',
+            name='token',
+            field=models.UUIDField(editable=False, null=True),
+        ),
+        migrations.RunPython(fill_tokens, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='deletionjob',
+            name='token',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, unique=True),
+        ),
+    ]
@@ -5,7 +5,10 @@ import uuid
 import os
 
 from django.conf import settings
-from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import connections, models
+from django.utils import timezone
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
@@ -78,11 +81,93 @@ class Receipe(models.Model):
     tags = models.ManyToManyField('Tag')
     ingredients = models.ManyToManyField('Ingredient')
     image = models.ImageField(null=True, upload_to=receipe_image_file_path)
+    modified_at = models.DateTimeField(auto_now=True)
+    # Weighted title (A) and description (B) lexemes, kept up to date by a
+    # PostgreSQL trigger (see migration 0009).
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'id'], name='receipe_user_id_idx'),
+            # Range filters and sorted pages, id last as the tie-breaker.
+            models.Index(
+                fields=['user', 'time_minutes', 'id'],
+                name='receipe_user_time_idx',
+            ),
+            models.Index(
+                fields=['user', 'price', 'id'],
+                name='receipe_user_price_idx',
+            ),
+            GinIndex(
+                fields=['search_vector'],
+                name='receipe_search_vector_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
 
+class RecipeAttrManager(models.Manager):
+    """
+    Manager for tags and ingredients, unique per user and name
+    """
+
+    def get_or_create_names(self, user, names):
+        """
+        Return the user's rows with the given names, creating missing ones.
+
+        Safe under concurrent calls for the same user: inserts skip names
+        created meanwhile by someone else (ON CONFLICT DO NOTHING) and those
+        rows are read back instead.
+        """
+        names = list(dict.fromkeys(names))
+        if not names:
+            return []
+
+        objs = list(self.filter(user=user, name__in=names))
+        missing = set(names) - {obj.name for obj in objs}
+        if not missing:
+            return objs
+
+        if connections[self.db].vendor == 'postgresql':
+            inserted = self._insert_returning(user, sorted(missing))
+        else:
+            self.bulk_create(
+                [self.model(user=user, name=name) for name in missing],
+                ignore_conflicts=True,
+            )
+            inserted = []
+        objs += inserted
+
+        raced = missing - {obj.name for obj in inserted}
+        if raced:
+            objs += self.filter(user=user, name__in=raced)
+
+        return objs
+
+    def _insert_returning(self, user, names):
+        """
+        Insert names for user, returning the rows actually inserted
+        """
+        connection = connections[self.db]
+        quote = connection.ops.quote_name
+        columns = ['id', 'name', 'user_id', 'modified_at']
+        sql = (
+            f'INSERT INTO {quote(self.model._meta.db_table)} '
+            f'({quote("user_id")}, {quote("name")}, {quote("modified_at")}) '
+            'SELECT %s, name, %s FROM unnest(%s::text[]) AS names(name) '
+            f'ON CONFLICT ({quote("user_id")}, {quote("name")}) DO NOTHING '
+            f'RETURNING {", ".join(quote(column) for column in columns)}'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [user.pk, timezone.now(), names])
+            return [
+                self.model.from_db(self.db, columns, row)
+                for row in cursor.fetchall()
+            ]
+
+
 class Tag(models.Model):
     """
     Tags for filtering receipes
@@ -92,6 +177,17 @@ class Tag(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    modified_at = models.DateTimeField(auto_now=True)
+
+    objects = RecipeAttrManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                name='unique_tag_user_name',
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -106,6 +202,71 @@ class Ingredient(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    modified_at = models.DateTimeField(auto_now=True)
+
+    objects = RecipeAttrManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                name='unique_ingredient_user_name',
+            ),
+        ]
 
     def __str__(self):
         return self.name
+
+
+class DeletionJob(models.Model):
+    """
+    Background deletion of a user's account or of some of their receipes
+    """
+    KIND_USER = 'user'
+    KIND_RECEIPES = 'receipes'
+    KIND_CHOICES = [
+        (KIND_USER, 'User account'),
+        (KIND_RECEIPES, 'Receipes'),
+    ]
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    # Set to NULL once a user deletion job removes the user itself.
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        null=True,
+        on_delete=models.SET_NULL,
+    )
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    receipe_ids = models.JSONField(default=list, blank=True)
+    status = models.CharField(
+        max_length=16,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+    )
+    # Unguessable id to poll the job by, as the account may be gone.
+    token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    deleted = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['status', 'id'],
+                name='deletionjob_status_id_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} deletion {self.pk} ({self.status})'
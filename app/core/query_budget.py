@@ -0,0 +1,73 @@
+"""
+Per-request database query budgets for API views
+"""
+import logging
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    """
+    Raised when a view runs more queries than its budget allows
+    """
+
+
+class QueryCounter:
+    """
+    Database execute wrapper counting the queries run through it
+    """
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class QueryBudgetMixin:
+    """
+    Enforce a maximum number of database queries per view action.
+
+    `query_budget` maps an action name (or the lower case HTTP method for
+    views without actions) to the number of queries it may run. When
+    `QUERY_BUDGET_STRICT` is enabled an overrun raises, otherwise it is
+    logged as a warning.
+    """
+    query_budget = {}
+
+    def get_query_budget(self):
+        """
+        Return the query budget for the current request, if any
+        """
+        action = getattr(self, 'action', None) or self.request.method.lower()
+        return self.query_budget.get(action)
+
+    def check_query_budget(self, count):
+        """
+        Raise or log when count exceeds the budget of the request
+        """
+        budget = self.get_query_budget()
+        if budget is None or count <= budget:
+            return
+
+        msg = (
+            f'{self.__class__.__name__} ran {count} queries for '
+            f'{self.request.method} {self.request.path}, budget is {budget}'
+        )
+        if getattr(settings, 'QUERY_BUDGET_STRICT', False):
+            raise QueryBudgetExceeded(msg)
+        logger.warning(msg)
+
+    def dispatch(self, request, *args, **kwargs):
+        """
+        Count the queries run by the view and check them against the budget
+        """
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            response = super().dispatch(request, *args, **kwargs)
+        self.check_query_budget(counter.count)
+
+        return response
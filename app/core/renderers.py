@@ -0,0 +1,106 @@
+"""
+Fast JSON, MessagePack and export renderers for the API
+"""
+import csv
+import io
+
+import msgpack
+import orjson
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+# Types orjson cannot encode natively (Decimal, lazy strings, ...) and
+# datetimes, passed through so they match DRF's JSONEncoder exactly.
+_encode_default = JSONEncoder().default
+
+ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSON renderer encoding with orjson.
+
+    For the data the API renders (strings, ints, Decimals as strings,
+    datetimes and plain floats) output is byte-identical to DRF's compact
+    JSONRenderer. Floats differ where Python uses an exponent (`1e-05`
+    comes out as `0.00001`), and NaN and Infinity render as null where
+    JSONRenderer raises. Data orjson refuses, such as ints wider than 64
+    bits, and indented output (the browsable API, `; indent=` media types)
+    use the parent renderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent is not None or not self.compact or self.ensure_ascii:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data, default=_encode_default, option=ORJSON_OPTIONS,
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Keep JSON a strict javascript subset, as JSONRenderer does.
+        if b'\xe2\x80' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028')
+            ret = ret.replace(b'\xe2\x80\xa9', b'\\u2029')
+
+        return ret
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    Renderer which serializes to MessagePack.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        return msgpack.packb(data, default=_encode_default, use_bin_type=True)
+
+
+class NDJSONRenderer(FastJSONRenderer):
+    """
+    Renderer for newline delimited JSON, one document per line.
+
+    Streaming views write their own lines; this renders other responses
+    (such as errors) as a single line.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        return super().render(data, None, renderer_context) + b'\n'
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    Renderer for CSV, one row per dict with a header of its keys.
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        rows = data if isinstance(data, list) else [data]
+        out = io.StringIO()
+        if rows:
+            writer = csv.DictWriter(out, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+
+        return out.getvalue().encode(self.charset)
@@ -0,0 +1,143 @@
+"""
+Signal handlers keeping receipe modification timestamps, the per-user
+response cache generation and the similarity index current
+"""
+from django.conf import settings
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core import similarity
+from core.models import Receipe, Tag, Ingredient
+from core.response_cache import bump_generation
+from receipe.filters import receipe_links
+
+
+def touch_receipes(queryset):
+    """
+    Mark the receipes in queryset as modified now
+    """
+    queryset.update(modified_at=timezone.now())
+
+
+@receiver(m2m_changed, sender=Receipe.tags.through)
+@receiver(m2m_changed, sender=Receipe.ingredients.through)
+def touch_receipes_on_m2m_change(sender, instance, action, reverse, model,
+                                 pk_set, **kwargs):
+    """
+    Bump the receipes whose tags or ingredients were changed
+    """
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            touch_receipes(Receipe.objects.filter(pk=instance.pk))
+        return
+
+    # Reverse changes come from a tag or ingredient; pk_set holds receipe
+    # ids except on clear, where the affected receipes are captured first.
+    if action == 'pre_clear':
+        instance._cleared_receipe_ids = list(
+            instance.receipe_set.values_list('pk', flat=True)
+        )
+    elif action == 'post_clear':
+        receipe_ids = getattr(instance, '_cleared_receipe_ids', [])
+        touch_receipes(Receipe.objects.filter(pk__in=receipe_ids))
+    elif action in ('post_add', 'post_remove'):
+        touch_receipes(Receipe.objects.filter(pk__in=pk_set))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def touch_receipes_on_attr_change(sender, instance, created=False, **kwargs):
+    """
+    Bump the receipes rendering a renamed or deleted tag or ingredient
+    """
+    if not created:
+        touch_receipes(instance.receipe_set.all())
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def start_generation_for_new_user(sender, instance, created, **kwargs):
+    """
+    Start new users on a fresh generation, even if their id is reused
+    """
+    if created:
+        bump_generation(instance.pk)
+
+
+@receiver(post_save, sender=Receipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Receipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def bump_generation_on_write(sender, instance, **kwargs):
+    """
+    Invalidate the cached responses of the owner of a changed row
+    """
+    bump_generation(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Receipe.tags.through)
+@receiver(m2m_changed, sender=Receipe.ingredients.through)
+def bump_generation_on_m2m_change(sender, instance, action, **kwargs):
+    """
+    Invalidate the cached responses of the owner of changed links
+    """
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_generation(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Receipe.tags.through)
+@receiver(m2m_changed, sender=Receipe.ingredients.through)
+def update_similarity_on_m2m_change(sender, instance, action, reverse,
+                                    model, pk_set, **kwargs):
+    """
+    Apply changed links to the similarity index
+    """
+    if action == 'pre_clear' and not reverse:
+        _, column = receipe_links(model)
+        instance._cleared_attr_ids = list(sender.objects.filter(
+            receipe_id=instance.pk,
+        ).values_list(column, flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    added = action == 'post_add'
+    if reverse:
+        # The reverse pre_clear is captured by touch_receipes_on_m2m_change.
+        if action == 'post_clear':
+            pk_set = getattr(instance, '_cleared_receipe_ids', [])
+        similarity.update_links(
+            instance.user_id, type(instance), [instance.pk], pk_set, added,
+        )
+    else:
+        if action == 'post_clear':
+            pk_set = getattr(instance, '_cleared_attr_ids', [])
+        similarity.update_links(
+            instance.user_id, model, pk_set, [instance.pk], added,
+        )
+
+
+@receiver(post_delete, sender=Receipe)
+def discard_similar_receipe(sender, instance, **kwargs):
+    """
+    Drop a deleted receipe from the similarity index
+    """
+    similarity.discard_receipe(instance.user_id, instance.pk)
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def discard_similarity_feature(sender, instance, **kwargs):
+    """
+    Drop a deleted tag or ingredient from the similarity index
+    """
+    similarity.discard_feature(instance.user_id, sender, instance.pk)
@@ -0,0 +1,311 @@
+"""
+In-memory inverted index of receipe tags and ingredients for similar
+receipe lookups
+"""
+import threading
+import time
+from collections import OrderedDict
+from itertools import chain
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from core.models import Tag, Ingredient
+from receipe.filters import receipe_links
+
+# Tags and ingredients share one feature space, feature = id * 2 + kind.
+FEATURE_KINDS = {Tag: 0, Ingredient: 1}
+
+EMPTY_POSTING = np.empty(0, dtype=np.intp)
+
+_indexes = OrderedDict()
+_lock = threading.Lock()
+
+
+def feature_ids(model, ids):
+    """
+    Return the features of the given tag or ingredient ids
+    """
+    return [pk * 2 + FEATURE_KINDS[model] for pk in ids]
+
+
+def _version_key(user_id):
+    return f'receipe:similarity:{user_id}'
+
+
+def get_version(user_id):
+    """
+    Return the current similarity index version of a user
+    """
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        # Seeded from the clock, like the response cache generation.
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+
+    return version
+
+
+def _bump_version(user_id):
+    """
+    Move the version of a user on, returning it if it was known
+    """
+    key = _version_key(user_id)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+        return None
+
+
+class SimilarityIndex:
+    """
+    Inverted index from features to the receipes of a user.
+
+    Rows are the receipes that had a tag or ingredient when the index was
+    built, in id order. Postings map each feature to the rows carrying it
+    and sizes holds the feature count of each row, so the overlap of every
+    receipe with a set of features is one bincount over their postings.
+    """
+    def __init__(self, version, ids, sizes, postings):
+        self.version = version
+        self.ids = ids
+        self.sizes = sizes
+        self.postings = postings
+        self.alive = np.ones(len(ids), dtype=bool)
+
+    @classmethod
+    def build(cls, user_id, version):
+        """
+        Build the index of a user from the through tables
+        """
+        receipe_ids, features = [], []
+        for model, kind in FEATURE_KINDS.items():
+            through, column = receipe_links(model)
+            links = through.objects.filter(
+                receipe__user_id=user_id,
+            ).values_list('receipe_id', column)
+            pairs = np.fromiter(
+                chain.from_iterable(links.iterator()), dtype=np.int64,
+            ).reshape(-1, 2)
+            receipe_ids.append(pairs[:, 0])
+            features.append(pairs[:, 1] * 2 + kind)
+
+        ids, rows = np.unique(
+            np.concatenate(receipe_ids), return_inverse=True,
+        )
+        features = np.concatenate(features)
+        order = np.argsort(features, kind='stable')
+        keys, starts = np.unique(features[order], return_index=True)
+        postings = dict(zip(
+            keys.tolist(), np.split(rows[order], starts[1:]),
+        ))
+
+        return cls(
+            version, ids, np.bincount(rows, minlength=len(ids)), postings,
+        )
+
+    def _row(self, receipe_id):
+        row = int(np.searchsorted(self.ids, receipe_id))
+        if row < len(self.ids) and self.ids[row] == receipe_id:
+            return row
+        return None
+
+    def add(self, receipe_id, features):
+        """
+        Record features linked to a receipe.
+
+        Returns False if the receipe can't be appended in id order, the
+        index must then be rebuilt.
+        """
+        row = self._row(receipe_id)
+        if row is None:
+            if len(self.ids) and receipe_id < self.ids[-1]:
+                return False
+            row = len(self.ids)
+            self.ids = np.append(self.ids, receipe_id)
+            self.sizes = np.append(self.sizes, 0)
+            self.alive = np.append(self.alive, True)
+
+        for feature in features:
+            posting = self.postings.get(feature, EMPTY_POSTING)
+            if (posting == row).any():
+                continue
+            self.postings[feature] = np.append(posting, row)
+            self.sizes[row] += 1
+
+        return True
+
+    def remove(self, receipe_id, features):
+        """
+        Record features unlinked from a receipe
+        """
+        row = self._row(receipe_id)
+        if row is None:
+            return True
+
+        for feature in features:
+            posting = self.postings.get(feature, EMPTY_POSTING)
+            keep = posting != row
+            if keep.all():
+                continue
+            self.postings[feature] = posting[keep]
+            self.sizes[row] -= 1
+
+        return True
+
+    def discard_receipe(self, receipe_id):
+        """
+        Stop returning a deleted receipe
+        """
+        row = self._row(receipe_id)
+        if row is not None:
+            self.alive[row] = False
+        return True
+
+    def discard_feature(self, feature):
+        """
+        Forget a deleted tag or ingredient
+        """
+        posting = self.postings.pop(feature, None)
+        if posting is not None:
+            np.subtract.at(self.sizes, posting, 1)
+        return True
+
+    def similar(self, receipe_id, features, k):
+        """
+        Return (id, Jaccard similarity) of the k receipes sharing the
+        most of features, best and then newest first
+        """
+        postings = [
+            self.postings[feature] for feature in features
+            if feature in self.postings
+        ]
+        if not postings:
+            return []
+
+        overlap = np.bincount(
+            np.concatenate(postings), minlength=len(self.ids),
+        )
+        overlap[~self.alive] = 0
+        row = self._row(receipe_id)
+        if row is not None:
+            overlap[row] = 0
+
+        rows = np.flatnonzero(overlap)
+        shared = overlap[rows]
+        scores = shared / (self.sizes[rows] + len(features) - shared)
+        if len(rows) > k:
+            # Keep the top k and anything tied with the k-th best, so ties
+            # are ordered by id rather than by partition order.
+            threshold = np.partition(scores, len(rows) - k)[len(rows) - k]
+            best = scores >= threshold
+            rows, scores = rows[best], scores[best]
+
+        order = np.lexsort((-self.ids[rows], -scores))[:k]
+        return list(zip(
+            self.ids[rows[order]].tolist(), scores[order].tolist(),
+        ))
+
+
+def get_index(user_id):
+    """
+    Return the current index of a user, building it if needed
+    """
+    version = get_version(user_id)
+    with _lock:
+        index = _indexes.get(user_id)
+        if index is not None and index.version == version:
+            _indexes.move_to_end(user_id)
+            return index
+
+    index = SimilarityIndex.build(user_id, version)
+    with _lock:
+        _indexes[user_id] = index
+        _indexes.move_to_end(user_id)
+        while len(_indexes) > settings.SIMILARITY_INDEX_MAX_USERS:
+            _indexes.popitem(last=False)
+
+    return index
+
+
+def similar_receipes(receipe, features, k):
+    """
+    Return (id, similarity) of the k receipes of the same user most
+    similar to a receipe with the given features
+    """
+    features = set(features)
+    if not features:
+        return []
+
+    index = get_index(receipe.user_id)
+    with _lock:
+        return index.similar(receipe.id, features, k)
+
+
+def _on_commit(user_id, change):
+    """
+    Apply change to the index of a user once the transaction commits.
+
+    Each change moves the shared version on. This process follows it when
+    no other change came in between, other processes rebuild on their
+    next lookup. Changes are idempotent, as a rebuild racing the commit
+    may already include them.
+    """
+    def apply():
+        version = _bump_version(user_id)
+        with _lock:
+            index = _indexes.get(user_id)
+            if index is None:
+                return
+            if (
+                version is not None
+                and index.version == version - 1
+                and change(index)
+            ):
+                index.version = version
+            else:
+                del _indexes[user_id]
+
+    transaction.on_commit(apply)
+
+
+def update_links(user_id, model, ids, receipe_ids, added):
+    """
+    Record tags or ingredients linked to or unlinked from receipes
+    """
+    features = feature_ids(model, ids)
+    receipe_ids = list(receipe_ids)
+
+    def change(index):
+        method = index.add if added else index.remove
+        return all(
+            method(receipe_id, features) for receipe_id in receipe_ids
+        )
+
+    _on_commit(user_id, change)
+
+
+def discard_receipe(user_id, receipe_id):
+    """
+    Record a deleted receipe
+    """
+    _on_commit(user_id, lambda index: index.discard_receipe(receipe_id))
+
+
+def discard_feature(user_id, model, pk):
+    """
+    Record a deleted tag or ingredient
+    """
+    feature, = feature_ids(model, [pk])
+    _on_commit(user_id, lambda index: index.discard_feature(feature))
+
+
+def invalidate(user_id):
+    """
+    Rebuild the index of a user after writes that bypass signals
+    """
+    _on_commit(user_id, lambda index: False)
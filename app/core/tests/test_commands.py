@@ -1,11 +1,26 @@
 """
 Test custom Django management commands
 """
+import json
+import os
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from unittest import skipIf, skipUnless
 from unittest.mock import patch
 from psycopg2 import OperationalError as Psycopg2Error
+from django.contrib.auth import get_user_model
 from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core.management.commands.import_receipes import (
+    clean_record,
+    read_records,
+)
+from core.models import DeletionJob, Receipe, Tag
 
 
 @patch('core.management.commands.wait_for_db.Command.check')
@@ -32,3 +47,256 @@ class CommandTests(SimpleTestCase):
         call_command('wait_for_db')
         self.assertEqual(patched_check.call_count, 6)
         patched_check.assert_called_with(databases=['default'])
+
+
+class ExplainReceipeQueriesTests(TestCase):
+    """
+    Test the explain_receipe_queries command.
+    """
+
+    def test_explain_every_endpoint(self):
+        """
+        Test a plan is printed for each receipe API endpoint
+        """
+        user = get_user_model().objects.create_user(
+            'user@example.com',
+            'test123',
+        )
+        receipe = Receipe.objects.create(
+            user=user,
+            title='Sample receipe',
+            time_minutes=5,
+            price=Decimal('5.00'),
+        )
+        receipe.tags.add(Tag.objects.create(user=user, name='Vegan'))
+        out = StringIO()
+
+        call_command('explain_receipe_queries', user.email, stdout=out)
+
+        output = out.getvalue()
+        for label in ['receipe list', 'receipe detail', 'tag list',
+                      'ingredient list ?assigned_only=1']:
+            self.assertIn(label, output)
+
+    def test_explain_unknown_user(self):
+        """
+        Test an unknown email raises a command error
+        """
+        with self.assertRaises(CommandError):
+            call_command('explain_receipe_queries', 'nobody@example.com')
+
+
+class BenchRenderersTests(SimpleTestCase):
+    """
+    Test the bench_renderers command.
+    """
+
+    def test_bench_renderers(self):
+        """
+        Test every renderer is timed
+        """
+        out = StringIO()
+
+        call_command(
+            'bench_renderers', receipes=10, iterations=1, stdout=out,
+        )
+
+        output = out.getvalue()
+        for name in ['JSONRenderer', 'FastJSONRenderer',
+                     'MessagePackRenderer']:
+            self.assertIn(name, output)
+
+
+class ImportReceipesTests(TestCase):
+    """
+    Test the import_receipes command.
+    """
+
+    def test_read_ndjson_records(self):
+        """
+        Test NDJSON records accept names or exported name objects
+        """
+        stream = StringIO(
+            '{"title": "Curry", "tags": [{"id": 1, "name": "Thai"}]}\n'
+            '\n'
+            '{"title": "Soup", "ingredients": ["Leek"]}\n'
+        )
+
+        records = list(read_records(stream, 'ndjson'))
+
+        self.assertEqual(len(records), 2)
+        self.assertEqual(records[0]['tags'], ['Thai'])
+        self.assertEqual(records[1]['tags'], [])
+        self.assertEqual(records[1]['ingredients'], ['Leek'])
+
+    def test_read_csv_records(self):
+        """
+        Test CSV records split | separated tags and ingredients
+        """
+        stream = StringIO(
+            'title,time_minutes,price,tags,ingredients\n'
+            'Curry,30,5.25,Thai|Spicy,\n'
+        )
+
+        record, = read_records(stream, 'csv')
+
+        self.assertEqual(record['tags'], ['Thai', 'Spicy'])
+        self.assertEqual(clean_record(record)['ingredients'], [])
+
+    def test_clean_record(self):
+        """
+        Test records are normalised and names deduplicated
+        """
+        cleaned = clean_record({
+            'title': ' Curry ',
+            'time_minutes': '30',
+            'price': '5.5',
+            'tags': ['Thai', 'Thai', ' '],
+        })
+
+        self.assertEqual(cleaned['title'], 'Curry')
+        self.assertEqual(cleaned['time_minutes'], 30)
+        self.assertEqual(cleaned['price'], Decimal('5.50'))
+        self.assertEqual(cleaned['tags'], ['Thai'])
+        self.assertEqual(cleaned['description'], '')
+
+    def test_clean_record_invalid(self):
+        """
+        Test invalid records raise a ValueError
+        """
+        valid = {'title': 'Curry', 'time_minutes': 30, 'price': '5.00'}
+        for change in [{'title': ''}, {'time_minutes': 'soon'},
+                       {'price': 'cheap'}, {'price': '1000'}]:
+            with self.assertRaises(ValueError):
+                clean_record({**valid, **change})
+
+    @skipIf(connection.vendor == 'postgresql', 'COPY is available')
+    def test_import_requires_postgresql(self):
+        """
+        Test the command refuses to run without PostgreSQL
+        """
+        with self.assertRaises(CommandError):
+            call_command('import_receipes', 'user@example.com', '-')
+
+    @skipUnless(connection.vendor == 'postgresql', 'COPY needs PostgreSQL')
+    def test_import_resumes_from_checkpoint(self):
+        """
+        Test an import loads receipes and links and skips checkpointed ones
+        """
+        user = get_user_model().objects.create_user(
+            'user@example.com',
+            'test123',
+        )
+        Tag.objects.create(user=user, name='Thai')
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'receipes.ndjson')
+            with open(path, 'w') as f:
+                for i in range(5):
+                    f.write(json.dumps({
+                        'title': f'Receipe {i}',
+                        'time_minutes': 10,
+                        'price': '5.00',
+                        'tags': ['Thai', f'Tag {i % 2}'],
+                    }) + '\n')
+            checkpoint = os.path.join(tmp, 'checkpoint.json')
+            with open(checkpoint, 'w') as f:
+                json.dump({'source': path, 'records': 2}, f)
+
+            call_command(
+                'import_receipes', user.email, path,
+                batch_size=2, checkpoint=checkpoint, stdout=StringIO(),
+            )
+
+            with open(checkpoint) as f:
+                self.assertEqual(json.load(f)['records'], 5)
+
+        receipes = Receipe.objects.filter(user=user).order_by('id')
+        self.assertEqual(
+            [receipe.title for receipe in receipes],
+            ['Receipe 2', 'Receipe 3', 'Receipe 4'],
+        )
+        self.assertEqual(Tag.objects.filter(user=user).count(), 3)
+        self.assertEqual(receipes[1].tags.count(), 2)
+
+    @skipUnless(connection.vendor == 'postgresql', 'COPY needs PostgreSQL')
+    def test_import_warns_process_local_cache(self):
+        """
+        Test an import warns when its invalidation stays in its process
+        """
+        get_user_model().objects.create_user('user@example.com', 'test123')
+        err = StringIO()
+
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson') as f:
+            call_command(
+                'import_receipes', 'user@example.com', f.name,
+                stdout=StringIO(), stderr=err,
+            )
+
+        self.assertIn('CACHE_BACKEND', err.getvalue())
+
+
+class ProcessDeletionJobsTests(TestCase):
+    """
+    Test the process_deletion_jobs command.
+    """
+
+    def test_process_pending_jobs(self):
+        """
+        Test pending jobs are run and finished jobs left alone
+        """
+        user = get_user_model().objects.create_user(
+            'user@example.com',
+            'test123',
+        )
+        Receipe.objects.create(
+            user=user,
+            title='Sample receipe',
+            time_minutes=5,
+            price=Decimal('5.00'),
+        )
+        done = DeletionJob.objects.create(
+            user=user,
+            kind=DeletionJob.KIND_USER,
+            status=DeletionJob.STATUS_DONE,
+        )
+        pending = DeletionJob.objects.create(
+            user=user,
+            kind=DeletionJob.KIND_USER,
+        )
+        out = StringIO()
+
+        call_command('process_deletion_jobs', once=True, stdout=out)
+
+        pending.refresh_from_db()
+        self.assertEqual(pending.status, DeletionJob.STATUS_DONE)
+        self.assertIn(f'Deletion job {pending.id}: done', out.getvalue())
+        self.assertNotIn(f'Deletion job {done.id}:', out.getvalue())
+        self.assertFalse(Receipe.objects.exists())
+
+    def test_warn_process_local_cache(self):
+        """
+        Test the worker warns when its invalidations stay in its process
+        """
+        err = StringIO()
+
+        call_command(
+            'process_deletion_jobs', once=True, stdout=StringIO(), stderr=err,
+        )
+
+        self.assertIn('CACHE_BACKEND', err.getvalue())
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': tempfile.gettempdir(),
+    }})
+    def test_no_warning_with_shared_cache(self):
+        """
+        Test a cache shared between processes raises no warning
+        """
+        err = StringIO()
+
+        call_command(
+            'process_deletion_jobs', once=True, stdout=StringIO(), stderr=err,
+        )
+
+        self.assertEqual(err.getvalue(), '')
@@ -0,0 +1,93 @@
+"""
+Tests for background deletion jobs
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from core import models
+from core.deletion import run_deletion_job
+
+
+def create_receipe(user, title='Sample receipe'):
+    """Create and return a receipe with a tag and an ingredient."""
+    receipe = models.Receipe.objects.create(
+        user=user,
+        title=title,
+        time_minutes=5,
+        price=Decimal('5.00'),
+    )
+    tag, _ = models.Tag.objects.get_or_create(user=user, name='Vegan')
+    ingredient, _ = models.Ingredient.objects.get_or_create(
+        user=user,
+        name='Salt',
+    )
+    receipe.tags.add(tag)
+    receipe.ingredients.add(ingredient)
+    return receipe
+
+
+class DeletionJobTests(TestCase):
+    """Test running deletion jobs."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'test123',
+        )
+        self.other = get_user_model().objects.create_user(
+            'other@example.com',
+            'test123',
+        )
+        self.receipes = [
+            create_receipe(self.user, f'Receipe {i}') for i in range(5)
+        ]
+        self.other_receipe = create_receipe(self.other)
+
+    def test_delete_user(self):
+        """Test a user job removes the account and all its data in chunks."""
+        job = models.DeletionJob.objects.create(
+            user=self.user,
+            kind=models.DeletionJob.KIND_USER,
+        )
+
+        run_deletion_job(job, chunk_size=2)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, models.DeletionJob.STATUS_DONE)
+        self.assertIsNone(job.user)
+        self.assertIsNotNone(job.finished_at)
+        # 5 receipes, 10 links, a tag, an ingredient and the user.
+        self.assertEqual(job.deleted, 18)
+        self.assertFalse(
+            get_user_model().objects.filter(id=self.user.id).exists()
+        )
+        self.assertEqual(models.Receipe.objects.count(), 1)
+        self.assertEqual(models.Tag.objects.count(), 1)
+        self.assertEqual(models.Receipe.tags.through.objects.count(), 1)
+        self.assertEqual(self.other_receipe.tags.count(), 1)
+
+    def test_delete_receipes(self):
+        """Test a receipe job only removes the user's listed receipes."""
+        job = models.DeletionJob.objects.create(
+            user=self.user,
+            kind=models.DeletionJob.KIND_RECEIPES,
+            receipe_ids=[
+                self.receipes[0].id,
+                self.receipes[1].id,
+                self.other_receipe.id,
+            ],
+        )
+
+        run_deletion_job(job, chunk_size=1)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, models.DeletionJob.STATUS_DONE)
+        self.assertEqual(job.deleted, 6)
+        self.assertEqual(
+            set(models.Receipe.objects.values_list('id', flat=True)),
+            {receipe.id for receipe in self.receipes[2:]}
+            | {self.other_receipe.id},
+        )
+        self.assertTrue(models.Tag.objects.filter(user=self.user).exists())
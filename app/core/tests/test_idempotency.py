@@ -0,0 +1,162 @@
+"""
+Tests for Idempotency-Key handling
+"""
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework.views import APIView
+
+from core.idempotency import idempotent, request_fingerprint
+
+
+class CountingView(APIView):
+    """
+    View counting the POST requests it handles
+    """
+    authentication_classes = []
+    permission_classes = []
+    calls = 0
+
+    @idempotent
+    def post(self, request):
+        CountingView.calls += 1
+        if request.data.get('fail'):
+            return Response(status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        return Response(
+            {'call': CountingView.calls, 'price': request.data.get('price')},
+            status=status.HTTP_201_CREATED,
+        )
+
+
+class IdempotencyTests(SimpleTestCase):
+    """
+    Test replaying responses for repeated keys
+    """
+
+    def setUp(self):
+        cache.clear()
+        CountingView.calls = 0
+        self.factory = APIRequestFactory()
+        self.view = CountingView.as_view()
+        self.user = get_user_model()(pk=1, email='user@example.com')
+
+    def _post(self, data, key='key-1', anonymous=False):
+        headers = {'HTTP_IDEMPOTENCY_KEY': key} if key else {}
+        request = self.factory.post('/count/', data, format='json', **headers)
+        if not anonymous:
+            force_authenticate(request, user=self.user)
+        return self.view(request)
+
+    def test_without_key(self):
+        """
+        Test requests without a key always run
+        """
+        self._post({}, key=None)
+        res = self._post({}, key=None)
+
+        self.assertEqual(res.data['call'], 2)
+
+    def test_retry_replays_response(self):
+        """
+        Test a retry with the same key gets the first response back
+        """
+        first = self._post({'price': '5.25'})
+        retry = self._post({'price': '5.25'})
+
+        self.assertEqual(CountingView.calls, 1)
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+
+    def test_keys_are_independent(self):
+        """
+        Test a new key runs the request again
+        """
+        self._post({})
+        res = self._post({}, key='key-2')
+
+        self.assertEqual(res.data['call'], 2)
+
+    def test_key_reused_for_other_payload(self):
+        """
+        Test reusing a key with a different payload is rejected
+        """
+        self._post({'price': '5.25'})
+        res = self._post({'price': '9.99'})
+
+        self.assertEqual(res.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(CountingView.calls, 1)
+
+    def test_keys_are_per_user(self):
+        """
+        Test another user reusing a key runs the request
+        """
+        self._post({})
+        self.user = get_user_model()(pk=2, email='other@example.com')
+        res = self._post({'price': '9.99'})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['call'], 2)
+
+    def test_anonymous_keys_are_per_payload(self):
+        """
+        Test anonymous clients only replay their own identical requests
+        """
+        first = self._post({'price': '5.25'}, anonymous=True)
+        other = self._post({'price': '9.99'}, anonymous=True)
+        retry = self._post({'price': '5.25'}, anonymous=True)
+
+        self.assertEqual(other.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(other.data['call'], 2)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(CountingView.calls, 2)
+
+    def test_request_in_progress(self):
+        """
+        Test a retry while the first request runs is rejected
+        """
+        def post_during_first(view, request):
+            CountingView.calls += 1
+            return self._post({})
+
+        with patch.object(CountingView, 'post', idempotent(post_during_first)):
+            res = self._post({})
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(CountingView.calls, 1)
+
+    def test_server_errors_not_stored(self):
+        """
+        Test a retry after a server error runs the request again
+        """
+        self._post({'fail': True})
+        self._post({'fail': True})
+
+        self.assertEqual(CountingView.calls, 2)
+
+    def test_key_too_long(self):
+        """
+        Test overlong keys are rejected
+        """
+        res = self._post({}, key='k' * 256)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(CountingView.calls, 0)
+
+    def test_fingerprint_keyed_by_secret(self):
+        """
+        Test payload digests depend on SECRET_KEY
+        """
+        request = CountingView().initialize_request(self.factory.post(
+            '/count/', {'password': 'secret123'}, format='json',
+        ))
+        fingerprint = request_fingerprint(request)
+
+        with override_settings(SECRET_KEY='other-secret'):
+            self.assertNotEqual(request_fingerprint(request), fingerprint)
@@ -3,6 +3,7 @@ Tests for Model
 """
 from unittest.mock import patch
 from decimal import Decimal
+from django.db import IntegrityError, transaction
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from core import models
@@ -113,3 +114,81 @@ class ModelTests(TestCase):
         )
 
         self.assertEqual(str(ingredient), ingredient.name)
+
+    def test_tag_and_ingredient_names_unique_per_user(self):
+        """
+        Test tag and ingredient names are unique for each user
+        """
+        user = create_user()
+        other_user = create_user(email='other@example.com')
+        for model in [models.Tag, models.Ingredient]:
+            model.objects.create(user=user, name='Name')
+            model.objects.create(user=other_user, name='Name')
+
+            with self.assertRaises(IntegrityError):
+                with transaction.atomic():
+                    model.objects.create(user=user, name='Name')
+
+    def test_get_or_create_names(self):
+        """
+        Test tags and ingredients are fetched or created by name
+        """
+        user = create_user()
+        other_user = create_user(email='other@example.com')
+        for model in [models.Tag, models.Ingredient]:
+            existing = model.objects.create(user=user, name='Old')
+            model.objects.create(user=other_user, name='New')
+
+            objs = model.objects.get_or_create_names(
+                user, ['Old', 'New', 'New'],
+            )
+
+            self.assertEqual(len(objs), 2)
+            self.assertIn(existing, objs)
+            self.assertEqual({obj.name for obj in objs}, {'Old', 'New'})
+            self.assertTrue(all(obj.user_id == user.id for obj in objs))
+            self.assertEqual(model.objects.filter(user=user).count(), 2)
+
+    def test_get_or_create_names_concurrent_insert(self):
+        """
+        Test names created by a concurrent request are read back
+        """
+        user = create_user()
+        bulk_create = models.RecipeAttrManager.bulk_create
+
+        def race_then_insert(manager, objs, **kwargs):
+            models.Tag.objects.create(user=user, name='Raced')
+            return bulk_create(manager, objs, **kwargs)
+
+        with patch.object(
+            models.RecipeAttrManager, 'bulk_create', race_then_insert,
+        ):
+            objs = models.Tag.objects.get_or_create_names(
+                user, ['Raced', 'New'],
+            )
+
+        self.assertEqual({obj.name for obj in objs}, {'Raced', 'New'})
+        self.assertEqual(models.Tag.objects.filter(user=user).count(), 2)
+
+    def test_receipe_modified_at_bumped_by_m2m_changes(self):
+        """
+        Test changing tags from either side bumps receipe modified_at
+        """
+        user = create_user()
+        receipe = models.Receipe.objects.create(
+            user=user,
+            title='Sample Receipe Name',
+            time_minutes=5,
+            price=Decimal('5.50'),
+        )
+        tag = models.Tag.objects.create(user=user, name='Tag1')
+        stamps = [receipe.modified_at]
+
+        receipe.tags.add(tag)
+        receipe.refresh_from_db()
+        stamps.append(receipe.modified_at)
+        tag.receipe_set.clear()
+        receipe.refresh_from_db()
+        stamps.append(receipe.modified_at)
+
+        self.assertEqual(stamps, sorted(set(stamps)))
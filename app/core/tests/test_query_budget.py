@@ -0,0 +1,68 @@
+"""
+Tests for per-request query budgets
+"""
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+
+from core.query_budget import QueryBudgetMixin, QueryBudgetExceeded
+
+
+class CountUsersView(QueryBudgetMixin, APIView):
+    """
+    View running two queries on GET
+    """
+    authentication_classes = []
+    permission_classes = []
+    query_budget = {'get': 1}
+
+    def get(self, request):
+        users = get_user_model().objects
+        return Response({'count': users.count(), 'exists': users.exists()})
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Test query budget enforcement
+    """
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+
+    @override_settings(QUERY_BUDGET_STRICT=True)
+    def test_budget_exceeded_raises_when_strict(self):
+        """
+        Test exceeding the budget raises in strict mode
+        """
+        request = self.factory.get('/users/')
+
+        with self.assertRaises(QueryBudgetExceeded):
+            CountUsersView.as_view()(request)
+
+    @override_settings(QUERY_BUDGET_STRICT=False)
+    def test_budget_exceeded_logs_when_not_strict(self):
+        """
+        Test exceeding the budget is logged outside strict mode
+        """
+        request = self.factory.get('/users/')
+
+        with self.assertLogs('core.query_budget', level='WARNING') as logs:
+            res = CountUsersView.as_view()(request)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn('ran 2 queries', logs.output[0])
+
+    @override_settings(QUERY_BUDGET_STRICT=True)
+    def test_within_budget(self):
+        """
+        Test a view within its budget responds normally
+        """
+        request = self.factory.get('/users/')
+        view = CountUsersView.as_view(query_budget={'get': 2})
+
+        res = view(request)
+
+        self.assertEqual(res.status_code, 200)
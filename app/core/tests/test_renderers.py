@@ -0,0 +1,115 @@
+"""
+Tests for the API renderers and parsers
+"""
+import datetime
+import uuid
+from decimal import Decimal
+from io import BytesIO
+
+import msgpack
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from core.management.commands.bench_renderers import build_payload
+from core.parsers import FastJSONParser, MessagePackParser
+from core.renderers import FastJSONRenderer, MessagePackRenderer
+
+
+SAMPLE = {
+    'price': Decimal('5.25'),
+    'created': datetime.datetime(2024, 1, 2, 3, 4, 5, 678901,
+                                 tzinfo=datetime.timezone.utc),
+    'day': datetime.date(2024, 1, 2),
+    'uuid': uuid.UUID('12345678123456781234567812345678'),
+    'message': _('Invalid cursor'),
+    'text': 'Crème fraîche\u2028line',
+    'nested': [{'id': 1, 'tags': ()}],
+    1: 'int key',
+}
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    """
+    Test the orjson renderer matches DRF's JSONRenderer
+    """
+
+    def test_output_identical_to_json_renderer(self):
+        """
+        Test rendering is byte-identical to the stock renderer
+        """
+        for data in [SAMPLE, build_payload(50), build_payload(50, False)]:
+            self.assertEqual(
+                FastJSONRenderer().render(data),
+                JSONRenderer().render(data),
+            )
+
+    def test_indented_output_falls_back(self):
+        """
+        Test indented media types are still honoured
+        """
+        data = {'id': 1}
+        media_type = 'application/json; indent=4'
+
+        self.assertEqual(
+            FastJSONRenderer().render(data, media_type),
+            JSONRenderer().render(data, media_type),
+        )
+
+    def test_unsupported_data_falls_back(self):
+        """
+        Test data orjson can't encode is rendered by the stock renderer
+        """
+        data = {'id': 2 ** 64}
+
+        self.assertEqual(
+            FastJSONRenderer().render(data),
+            JSONRenderer().render(data),
+        )
+
+    def test_parse_json(self):
+        """
+        Test parsing JSON and rejecting malformed input
+        """
+        parser = FastJSONParser()
+
+        self.assertEqual(parser.parse(BytesIO(b'{"a": [1]}')), {'a': [1]})
+        with self.assertRaises(ParseError):
+            parser.parse(BytesIO(b'{"a": '))
+
+
+class MessagePackTests(SimpleTestCase):
+    """
+    Test the MessagePack renderer and parser
+    """
+
+    def test_round_trip(self):
+        """
+        Test data survives rendering and parsing
+        """
+        payload = build_payload(5)
+
+        content = MessagePackRenderer().render(payload)
+        parsed = MessagePackParser().parse(BytesIO(content))
+
+        self.assertEqual(parsed, msgpack.unpackb(content, raw=False))
+        self.assertEqual(parsed['results'][3]['price'], '3.03')
+
+    def test_non_native_types(self):
+        """
+        Test types msgpack lacks are encoded like JSON
+        """
+        content = MessagePackRenderer().render(SAMPLE)
+        parsed = msgpack.unpackb(content, raw=False, strict_map_key=False)
+
+        self.assertEqual(parsed['price'], 5.25)
+        self.assertEqual(parsed['created'], '2024-01-02T03:04:05.678901Z')
+        self.assertEqual(parsed['message'], 'Invalid cursor')
+
+    def test_parse_invalid(self):
+        """
+        Test malformed MessagePack raises a parse error
+        """
+        with self.assertRaises(ParseError):
+            MessagePackParser().parse(BytesIO(b'\xc1'))
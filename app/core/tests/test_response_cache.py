@@ -0,0 +1,132 @@
+"""
+Tests for the per-user generational response cache
+"""
+import tempfile
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase, override_settings
+
+from core import models
+from core.response_cache import bump_generation, get_generation
+
+
+def create_user(email='user@example.com', password='test123'):
+    """
+    Create and return a new user
+    """
+    return get_user_model().objects.create_user(email, password)
+
+
+class GenerationTests(TestCase):
+    """
+    Test generation counters follow writes to a user's rows
+    """
+
+    def setUp(self):
+        self.user = create_user()
+
+    def assertBumped(self, func):
+        """
+        Assert calling func bumps the generation of the user
+        """
+        before = get_generation(self.user.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            func()
+        self.assertGreater(get_generation(self.user.pk), before)
+
+    def test_generation_bumped_by_writes(self):
+        """
+        Test saves, m2m changes and deletes bump the generation
+        """
+        receipe = models.Receipe.objects.create(
+            user=self.user,
+            title='Sample Receipe Name',
+            time_minutes=5,
+            price=Decimal('5.50'),
+        )
+        tag = models.Tag.objects.create(user=self.user, name='Tag1')
+
+        self.assertBumped(receipe.save)
+        self.assertBumped(lambda: receipe.tags.add(tag))
+        self.assertBumped(lambda: tag.receipe_set.clear())
+        self.assertBumped(tag.delete)
+        self.assertBumped(receipe.delete)
+
+    def test_generation_bumped_on_commit(self):
+        """
+        Test the generation only moves once the write commits
+        """
+        before = get_generation(self.user.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            models.Tag.objects.create(user=self.user, name='Tag1')
+            self.assertEqual(get_generation(self.user.pk), before)
+
+        self.assertGreater(get_generation(self.user.pk), before)
+
+    def test_generation_kept_on_rollback(self):
+        """
+        Test writes that roll back leave the generation unchanged
+        """
+        before = get_generation(self.user.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    models.Tag.objects.create(user=self.user, name='Tag1')
+                    raise ValueError
+            except ValueError:
+                pass
+
+        self.assertEqual(get_generation(self.user.pk), before)
+
+    def test_generation_independent_per_user(self):
+        """
+        Test writes by another user leave the generation unchanged
+        """
+        other_user = create_user(email='other@example.com')
+        before = get_generation(self.user.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            models.Tag.objects.create(user=other_user, name='Tag1')
+
+        self.assertEqual(get_generation(self.user.pk), before)
+
+    def test_generation_survives_lost_counter(self):
+        """
+        Test a lost counter restarts above every previous generation
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_generation(self.user.pk)
+        before = get_generation(self.user.pk)
+
+        cache.delete(f'receipe:generation:{self.user.pk}')
+
+        self.assertGreater(get_generation(self.user.pk), before)
+
+
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': tempfile.mkdtemp(),
+    }
+})
+class FileBasedGenerationTests(TestCase):
+    """
+    Test generations with the file based cache backend
+    """
+
+    def test_bump_generation(self):
+        """
+        Test bumping a generation on the file based backend
+        """
+        user = create_user()
+        before = get_generation(user.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_generation(user.pk)
+
+        self.assertEqual(get_generation(user.pk), before + 1)
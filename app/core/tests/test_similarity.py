@@ -0,0 +1,155 @@
+"""
+Tests for the similar receipe index
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+
+from core import models, similarity
+
+
+def create_receipe(user, tags=(), ingredients=()):
+    """Create and return a receipe linked to the named attributes."""
+    receipe = models.Receipe.objects.create(
+        user=user,
+        title='Sample receipe',
+        time_minutes=5,
+        price=Decimal('5.00'),
+    )
+    for model, names, relation in [
+        (models.Tag, tags, receipe.tags),
+        (models.Ingredient, ingredients, receipe.ingredients),
+    ]:
+        relation.add(*[
+            model.objects.get_or_create(user=user, name=name)[0]
+            for name in names
+        ])
+    return receipe
+
+
+def features(receipe):
+    """Return the features of a receipe."""
+    return similarity.feature_ids(
+        models.Tag, receipe.tags.values_list('id', flat=True),
+    ) + similarity.feature_ids(
+        models.Ingredient, receipe.ingredients.values_list('id', flat=True),
+    )
+
+
+class SimilarityIndexTests(TestCase):
+    """Test building and querying the similarity index."""
+
+    def setUp(self):
+        cache.clear()
+        similarity._indexes.clear()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'test123',
+        )
+        self.curry = create_receipe(
+            self.user, tags=['Spicy'], ingredients=['Rice', 'Chilli'],
+        )
+        self.chilli = create_receipe(
+            self.user, tags=['Spicy'], ingredients=['Beans', 'Chilli'],
+        )
+        self.risotto = create_receipe(self.user, ingredients=['Rice'])
+        self.cake = create_receipe(self.user, ingredients=['Flour'])
+        create_receipe(
+            get_user_model().objects.create_user('other@example.com'),
+            tags=['Spicy'], ingredients=['Rice', 'Chilli'],
+        )
+
+    def _similar(self, receipe, k=10):
+        return similarity.similar_receipes(receipe, features(receipe), k)
+
+    def test_similar_by_jaccard(self):
+        """Test receipes are ranked by tag and ingredient overlap."""
+        self.assertEqual(self._similar(self.curry), [
+            (self.chilli.id, 0.5),
+            (self.risotto.id, 1 / 3),
+        ])
+
+    def test_similar_limit_ties_newest_first(self):
+        """Test the top k breaks ties by newest receipe."""
+        twin = create_receipe(self.user, ingredients=['Rice'])
+
+        self.assertEqual(
+            self._similar(self.risotto, k=2),
+            [(twin.id, 1.0), (self.curry.id, 1 / 3)],
+        )
+        self.assertEqual(
+            similarity.similar_receipes(self.cake, [], 10), [],
+        )
+
+    def test_index_follows_links(self):
+        """Test link changes update the index without a rebuild."""
+        self._similar(self.curry)
+        index = similarity._indexes[self.user.id]
+        beans = models.Ingredient.objects.get(user=self.user, name='Beans')
+        spicy = models.Tag.objects.get(user=self.user, name='Spicy')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.risotto.ingredients.add(beans)
+            self.chilli.ingredients.remove(beans)
+            spicy.receipe_set.add(self.cake)
+
+        self.assertIs(similarity._indexes[self.user.id], index)
+        self.assertEqual(self._similar(self.chilli), [
+            (self.curry.id, 2 / 3),
+            (self.cake.id, 1 / 3),
+        ])
+
+    def test_index_follows_new_and_deleted_receipes(self):
+        """Test new receipes are added and deleted ones dropped."""
+        self._similar(self.curry)
+        index = similarity._indexes[self.user.id]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            pilaf = create_receipe(self.user, ingredients=['Rice'])
+            self.risotto.delete()
+            self.cake.ingredients.clear()
+
+        self.assertIs(similarity._indexes[self.user.id], index)
+        self.assertEqual(self._similar(self.curry), [
+            (self.chilli.id, 0.5),
+            (pilaf.id, 1 / 3),
+        ])
+
+    def test_index_follows_deleted_attributes(self):
+        """Test deleting a tag removes it from every receipe."""
+        self._similar(self.curry)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            models.Tag.objects.get(user=self.user, name='Spicy').delete()
+
+        self.assertEqual(self._similar(self.chilli), [
+            (self.curry.id, 1 / 3),
+        ])
+
+    def test_index_rebuilt_after_invalidate(self):
+        """Test writes bypassing signals rebuild the index."""
+        self._similar(self.curry)
+        through = models.Receipe.ingredients.through
+        rice = models.Ingredient.objects.get(user=self.user, name='Rice')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            through.objects.create(receipe=self.cake, ingredient=rice)
+            similarity.invalidate(self.user.id)
+
+        self.assertNotIn(self.user.id, similarity._indexes)
+        self.assertIn(
+            (self.cake.id, 1 / 4),
+            self._similar(self.curry),
+        )
+
+    def test_index_rebuilt_after_other_process_write(self):
+        """Test a version moved on elsewhere makes the index stale."""
+        self._similar(self.curry)
+        index = similarity._indexes[self.user.id]
+        cache.incr(similarity._version_key(self.user.id))
+
+        self._similar(self.curry)
+
+        self.assertIsNot(similarity._indexes[self.user.id], index)
@@ -0,0 +1,68 @@
+"""
+Tests for commit counting
+"""
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test import TransactionTestCase
+
+from core.models import Tag
+from core.transactions import CommitCounter
+
+
+class CommitCounterTests(TransactionTestCase):
+    """
+    Test counting the commits that persist writes
+    """
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'test123',
+        )
+
+    def _count(self, func):
+        counter = CommitCounter()
+        with connection.execute_wrapper(counter):
+            func()
+        return counter.count
+
+    def test_autocommit_writes(self):
+        """
+        Test each write outside a transaction is a commit
+        """
+        def write():
+            Tag.objects.create(user=self.user, name='Vegan')
+            Tag.objects.create(user=self.user, name='Dessert')
+            Tag.objects.count()
+
+        self.assertEqual(self._count(write), 2)
+
+    def test_atomic_block(self):
+        """
+        Test writes in nested atomic blocks make one commit
+        """
+        def write():
+            with transaction.atomic():
+                Tag.objects.create(user=self.user, name='Vegan')
+                with transaction.atomic():
+                    Tag.objects.create(user=self.user, name='Dessert')
+
+        self.assertEqual(self._count(write), 1)
+
+    def test_rolled_back_and_read_only_blocks(self):
+        """
+        Test rolled back or read only transactions are not counted
+        """
+        def write():
+            with transaction.atomic():
+                Tag.objects.count()
+            try:
+                with transaction.atomic():
+                    Tag.objects.create(user=self.user, name='Vegan')
+                    raise ValueError
+            except ValueError:
+                pass
+            with transaction.atomic():
+                Tag.objects.create(user=self.user, name='Dessert')
+
+        self.assertEqual(self._count(write), 1)
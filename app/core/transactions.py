@@ -0,0 +1,67 @@
+"""
+Instrumentation counting the database commits of a request
+"""
+import logging
+
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE')
+
+
+class CommitCounter:
+    """
+    Database execute wrapper counting the commits that persist writes.
+
+    A write run in autocommit mode is a commit of its own. Writes inside
+    an atomic block count once, when the outermost block commits; blocks
+    that roll back or only read are not counted.
+    """
+    def __init__(self, conn=None):
+        self.connection = conn or connection
+        self.count = 0
+
+    def _committed(self):
+        self.count += 1
+
+    def _pending(self):
+        """
+        Return whether this transaction already counts its commit
+        """
+        return any(
+            func == self._committed
+            for _, func in self.connection.run_on_commit
+        )
+
+    def __call__(self, execute, sql, params, many, context):
+        result = execute(sql, params, many, context)
+        if not sql.lstrip().upper().startswith(WRITE_STATEMENTS):
+            return result
+
+        if not self.connection.in_atomic_block:
+            self.count += 1
+        elif not self._pending():
+            self.connection.on_commit(self._committed)
+
+        return result
+
+
+class CommitCountMixin:
+    """
+    Log the number of commits each request of a view makes
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        """
+        Count the commits made while handling the request
+        """
+        counter = CommitCounter()
+        with connection.execute_wrapper(counter):
+            response = super().dispatch(request, *args, **kwargs)
+        logger.debug(
+            '%s %s made %d commits',
+            request.method, request.path, counter.count,
+        )
+
+        return response
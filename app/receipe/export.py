@@ -0,0 +1,59 @@
+"""
+Streaming export of receipes
+"""
+import csv
+import io
+from itertools import islice
+
+from django.conf import settings
+
+from core.renderers import FastJSONRenderer
+from receipe.serializers import ReceipeExportSerializer
+
+
+def iter_receipes(queryset, chunk_size=None):
+    """
+    Yield the export representation of every receipe in queryset.
+
+    Rows are read through a server-side cursor in chunks, and the tags and
+    ingredients of each chunk are fetched in one query per relation, so
+    memory stays bounded by the chunk size.
+    """
+    chunk_size = chunk_size or settings.RECEIPE_EXPORT_CHUNK_SIZE
+    fields = ReceipeExportSerializer.serializer_class.Meta.fields
+    rows = queryset.prefetch_related(None).values(
+        *ReceipeExportSerializer.value_fields(fields)
+    ).iterator(chunk_size=chunk_size)
+
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield from ReceipeExportSerializer(chunk).data
+
+
+def stream_ndjson(queryset):
+    """
+    Yield receipes as newline delimited JSON
+    """
+    renderer = FastJSONRenderer()
+    for receipe in iter_receipes(queryset):
+        yield renderer.render(receipe) + b'\n'
+
+
+def stream_csv(queryset):
+    """
+    Yield receipes as CSV with tags and ingredients as | separated names
+    """
+    fields = ReceipeExportSerializer.serializer_class.Meta.fields
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=fields)
+    writer.writeheader()
+
+    for receipe in iter_receipes(queryset):
+        for name in ReceipeExportSerializer.relation_models:
+            receipe[name] = '|'.join(item['name'] for item in receipe[name])
+        writer.writerow(receipe)
+        yield out.getvalue()
+        out.seek(0)
+        out.truncate()
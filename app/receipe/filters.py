@@ -0,0 +1,241 @@
+"""
+Filters for Receipe APIs
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    TrigramSimilarity,
+)
+from django.db import connection
+from django.db.models import (
+    Case,
+    Count,
+    Exists,
+    F,
+    IntegerField,
+    OuterRef,
+    Q,
+    Subquery,
+    Value,
+    When,
+)
+from django.db.models.functions import Cast, Coalesce, Upper
+from rest_framework.exceptions import ValidationError
+
+from core.models import Receipe, Tag, Ingredient
+
+
+MATCH_ANY = 'any'
+MATCH_ALL = 'all'
+MATCH_MODES = [MATCH_ANY, MATCH_ALL]
+
+# Text search configuration, matching the search_vector trigger.
+SEARCH_CONFIG = 'english'
+# Ranks are stored as scaled integers so cursors can page through them
+# without float rounding.
+SEARCH_RANK_SCALE = 1000000
+
+# Receipe fields accepting __gte and __lte range filters, with the
+# parser of their values.
+RANGE_FIELDS = {
+    'time_minutes': int,
+    'price': Decimal,
+}
+RANGE_LOOKUPS = ['gte', 'lte']
+
+# Fields receipes can be sorted by with ?ordering=, each backed by a
+# (user, <field>, id) index.
+ORDERING_FIELDS = ['id', 'time_minutes', 'price']
+ORDERING_CHOICES = [
+    f'{prefix}{name}' for name in ORDERING_FIELDS for prefix in ['', '-']
+]
+
+RECEIPE_RELATIONS = {
+    Tag: 'tags',
+    Ingredient: 'ingredients',
+}
+
+
+def receipe_links(model):
+    """
+    Return the through model and column linking receipes to model
+    """
+    through = getattr(Receipe, RECEIPE_RELATIONS[model]).through
+    return through, f'{model._meta.model_name}_id'
+
+
+def parse_match_mode(params, name):
+    """
+    Validate a match mode query parameter, defaulting to any
+    """
+    mode = params.get(name) or MATCH_ANY
+    if mode not in MATCH_MODES:
+        raise ValidationError(
+            {name: f'Expected one of {", ".join(MATCH_MODES)}.'}
+        )
+    return mode
+
+
+def filter_receipe_ranges(queryset, params):
+    """
+    Apply the ?<field>__gte= and ?<field>__lte= range filters
+    """
+    for field, parse in RANGE_FIELDS.items():
+        for lookup in RANGE_LOOKUPS:
+            name = f'{field}__{lookup}'
+            value = params.get(name)
+            if not value:
+                continue
+            try:
+                value = parse(value)
+            except (ValueError, InvalidOperation):
+                value = None
+            if value is None or not Decimal(value).is_finite():
+                raise ValidationError({name: 'A valid number is required.'})
+            queryset = queryset.filter(**{name: value})
+
+    return queryset
+
+
+def parse_ordering(params, name='ordering'):
+    """
+    Validate the sort order query parameter.
+
+    Returns the ordering with id as a tie-breaker in the same direction,
+    so it matches the (user, <field>, id) index, or None when not given.
+    """
+    ordering = params.get(name)
+    if not ordering:
+        return None
+    if ordering not in ORDERING_CHOICES:
+        raise ValidationError(
+            {name: f'Expected one of {", ".join(ORDERING_CHOICES)}.'}
+        )
+    if ordering.lstrip('-') == 'id':
+        return (ordering,)
+
+    return (ordering, '-id' if ordering.startswith('-') else 'id')
+
+
+def facet_counts(receipes, model):
+    """
+    Count the receipes linked to each tag or ingredient.
+
+    One aggregate over the through table, grouped by the linked row and
+    limited to receipes by an IN subquery, so no receipe row is loaded.
+    Links are unique, so each receipe is counted once.
+    """
+    through, column = receipe_links(model)
+    name = f'{column[:-len("_id")]}__name'
+    counts = through.objects.filter(
+        receipe_id__in=receipes.order_by().values('id'),
+    ).values_list(column, name).annotate(
+        count=Count('receipe_id'),
+    ).order_by('-count', name)
+
+    return [
+        {'id': pk, 'name': name, 'count': count}
+        for pk, name, count in counts
+    ]
+
+
+def filter_receipes_by(queryset, model, ids, mode=MATCH_ANY):
+    """
+    Filter receipes linked to any or all of the given model ids.
+
+    Each condition is a correlated EXISTS probe on the through table's
+    (receipe_id, <model>_id) index, so matching receipes are never joined
+    or deduplicated.
+    """
+    through, column = receipe_links(model)
+    links = through.objects.filter(receipe_id=OuterRef('pk'))
+
+    if mode == MATCH_ALL:
+        for pk in set(ids):
+            queryset = queryset.filter(Exists(links.filter(**{column: pk})))
+        return queryset
+
+    return queryset.filter(Exists(links.filter(**{f'{column}__in': ids})))
+
+
+def filter_assigned(queryset):
+    """
+    Filter tags or ingredients assigned to at least one receipe
+    """
+    through, column = receipe_links(queryset.model)
+    links = through.objects.filter(**{column: OuterRef('pk')})
+
+    return queryset.filter(Exists(links))
+
+
+def annotate_receipe_count(queryset):
+    """
+    Annotate tags or ingredients with the number of receipes using them.
+
+    The count is a subquery grouped on the through table's
+    (<attr>_id, receipe_id) index and correlated to each row, so it is
+    only computed for the rows actually fetched, such as one page.
+    """
+    through, column = receipe_links(queryset.model)
+    counts = through.objects.filter(
+        **{column: OuterRef('pk')},
+    ).order_by().values(column).annotate(count=Count('*')).values('count')
+
+    return queryset.annotate(recipe_count=Coalesce(
+        Subquery(counts, output_field=IntegerField()), 0,
+    ))
+
+
+def search_receipes(queryset, text):
+    """
+    Filter receipes matching a web search style query, annotated with
+    an integer search_rank.
+
+    On PostgreSQL this matches search_vector through its GIN index and
+    ranks title matches above description matches. Other backends fall
+    back to an unranked substring match.
+    """
+    if connection.vendor != 'postgresql':
+        return queryset.filter(
+            Q(title__icontains=text) | Q(description__icontains=text)
+        ).annotate(search_rank=Value(0, output_field=IntegerField()))
+
+    query = SearchQuery(text, config=SEARCH_CONFIG, search_type='websearch')
+    return queryset.filter(search_vector=query).annotate(
+        search_rank=Cast(
+            SearchRank(F('search_vector'), query) * SEARCH_RANK_SCALE,
+            IntegerField(),
+        ),
+    )
+
+
+def autocomplete_names(queryset, text):
+    """
+    Filter tags or ingredients whose name starts with or closely resembles
+    text, ordered prefix matches first, then by similarity.
+
+    On PostgreSQL both conditions are served by the trigram GIN index on
+    UPPER(name) (see migration 0010). Other backends fall back to an
+    unindexed substring match.
+    """
+    text = text.upper()
+    queryset = queryset.annotate(match_name=Upper('name'))
+    prefix = Q(match_name__startswith=text)
+    if connection.vendor == 'postgresql':
+        queryset = queryset.filter(
+            prefix | Q(match_name__trigram_similar=text)
+        ).annotate(similarity=TrigramSimilarity('match_name', text))
+    else:
+        queryset = queryset.filter(match_name__contains=text).annotate(
+            similarity=Value(0, output_field=IntegerField()),
+        )
+
+    return queryset.annotate(
+        is_prefix=Case(
+            When(prefix, then=1),
+            default=0,
+            output_field=IntegerField(),
+        ),
+    ).order_by('-is_prefix', '-similarity', 'name')
@@ -0,0 +1,116 @@
+"""
+Pagination classes for Receipe APIs
+"""
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+
+
+class ReceipeCursorPagination(CursorPagination):
+    """
+    Keyset pagination over receipes, newest first.
+
+    Orderings with a tie-breaker, such as ('price', 'id'), keep the value
+    of every field in the cursor. Each page then starts with a range seek
+    on the matching index, where DRF would filter on the first field only
+    and skip the rows sharing its value with an OFFSET.
+    """
+    ordering = '-id'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+    def get_ordering(self, request, queryset, view):
+        """
+        Return the ordering chosen by the view, if any, or the default
+        """
+        get_pagination_ordering = getattr(
+            view, 'get_pagination_ordering', None,
+        )
+        ordering = get_pagination_ordering and get_pagination_ordering()
+        return ordering or super().get_ordering(request, queryset, view)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        ordering = self.get_ordering(request, queryset, view)
+        cursor = super().decode_cursor(request)
+        if len(ordering) == 1 or cursor is None or cursor.position is None:
+            return super().paginate_queryset(queryset, request, view)
+
+        try:
+            queryset = queryset.filter(self._after_position(ordering, cursor))
+        except (ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        page = super().paginate_queryset(queryset, request, view)
+        # DRF saw a cursor without a position, restore the page links.
+        if cursor.reverse:
+            self.has_next, self.next_position = True, cursor.position
+        else:
+            self.has_previous, self.previous_position = True, cursor.position
+        if self.template is not None:
+            self.display_page_controls = True
+
+        return page
+
+    def decode_cursor(self, request):
+        """
+        Hide composite positions from DRF, they are applied beforehand
+        """
+        cursor = super().decode_cursor(request)
+        if cursor is not None and len(self.ordering) > 1:
+            return cursor._replace(position=None)
+        return cursor
+
+    def _after_position(self, ordering, cursor):
+        """
+        Return the condition selecting rows past a composite position.
+
+        For ('price', 'id') after (p, i) this is
+        price >= p AND (price > p OR (price = p AND id > i)), so the
+        leading range is an index condition and the rest only filters
+        the rows tied on price.
+        """
+        try:
+            values = json.loads(cursor.position)
+        except ValueError:
+            values = None
+        if not isinstance(values, list) or len(values) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        lookups = []
+        for field in ordering:
+            # Same rule as DRF: ascending and forwards or descending and
+            # backwards continue with greater values.
+            descending = field.startswith('-')
+            lookups.append(
+                (field.lstrip('-'), 'lt' if cursor.reverse != descending
+                 else 'gt')
+            )
+
+        condition = None
+        for (attr, op), value in reversed(list(zip(lookups, values))):
+            past = Q(**{f'{attr}__{op}': value})
+            condition = past if condition is None else (
+                past | (Q(**{attr: value}) & condition)
+            )
+        attr, op = lookups[0]
+
+        return Q(**{f'{attr}__{op}e': values[0]}) & condition
+
+    def _get_position_from_instance(self, instance, ordering):
+        if len(ordering) == 1:
+            return super()._get_position_from_instance(instance, ordering)
+
+        position = super()._get_position_from_instance
+        return json.dumps([
+            position(instance, [field]) for field in ordering
+        ])
+
+
+class RecipeAttrCursorPagination(ReceipeCursorPagination):
+    """
+    Keyset pagination over tags and ingredients by name
+    """
+    ordering = '-name'
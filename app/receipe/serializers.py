@@ -1,11 +1,34 @@
 """
 Serializers for Receipe APIs.
 """
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
 from rest_framework import serializers
+from rest_framework.settings import api_settings
+from rest_framework.utils.serializer_helpers import ReturnList
+from core import similarity
 from core.models import Receipe, Tag, Ingredient
+from core.response_cache import bump_generation
+from receipe.filters import receipe_links
+
+
+class BaseRecipeAttrSerializer(serializers.ModelSerializer):
+    """Base serializer for receipe attributes with per-user unique names."""
 
+    def update(self, instance, validated_data):
+        """Update the attribute, rejecting names already in use."""
+        try:
+            with transaction.atomic():
+                return super().update(instance, validated_data)
+        except IntegrityError:
+            raise serializers.ValidationError(
+                {'name': ['You already have an item with this name.']}
+            )
 
-class IngredientSerializer(serializers.ModelSerializer):
+
+class IngredientSerializer(BaseRecipeAttrSerializer):
     """Serializer for ingredients."""
 
     class Meta:
@@ -14,7 +37,7 @@ class IngredientSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(BaseRecipeAttrSerializer):
     """
     Serializers for Tags
     """
@@ -25,6 +48,22 @@ class TagSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
+class IngredientCountSerializer(IngredientSerializer):
+    """Serializer for ingredients with the number of receipes using them."""
+    recipe_count = serializers.IntegerField(read_only=True)
+
+    class Meta(IngredientSerializer.Meta):
+        fields = IngredientSerializer.Meta.fields + ['recipe_count']
+
+
+class TagCountSerializer(TagSerializer):
+    """Serializer for tags with the number of receipes using them."""
+    recipe_count = serializers.IntegerField(read_only=True)
+
+    class Meta(TagSerializer.Meta):
+        fields = TagSerializer.Meta.fields + ['recipe_count']
+
+
 class ReceipeSerializer(serializers.ModelSerializer):
     """
     Serializer for receipe
@@ -32,6 +71,9 @@ class ReceipeSerializer(serializers.ModelSerializer):
     tags = TagSerializer(many=True, required=False)
     ingredients = IngredientSerializer(many=True, required=False)
 
+    # Nested relations only rendered when requested through sparse fields.
+    expandable_fields = ['tags', 'ingredients']
+
     class Meta:
         model = Receipe
         fields = [
@@ -40,33 +82,59 @@ class ReceipeSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id']
 
-    def _get_or_create_tags(self, tags, receipe):
-        """Handle getting or creating tags as needed."""
+    def __init__(self, *args, **kwargs):
+        """Optionally restrict the serializer to the given fields."""
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    def _get_or_create_attrs(self, model, items):
+        """Return the named tags or ingredients, creating missing ones."""
         auth_user = self.context['request'].user
-        for tag in tags:
-            tag_obj, created = Tag.objects.get_or_create(
-                user=auth_user,
-                **tag,
+        return model.objects.get_or_create_names(
+            auth_user,
+            [item['name'] for item in items],
+        )
+
+    def _add_links(self, receipe, model, items):
+        """Link a new receipe to the named tags or ingredients.
+
+        Link rows are bulk inserted directly: a new receipe has no links to
+        look up first and no modified_at to bump, which add() would do.
+        The similarity index is told since no m2m_changed is sent.
+        """
+        through, column = receipe_links(model)
+        objs = self._get_or_create_attrs(model, items)
+        through.objects.bulk_create([
+            through(receipe_id=receipe.id, **{column: obj.id})
+            for obj in objs
+        ], ignore_conflicts=True)
+        if objs:
+            similarity.update_links(
+                receipe.user_id, model, [obj.id for obj in objs],
+                [receipe.id], added=True,
             )
-            receipe.tags.add(tag_obj)
+
+    def _get_or_create_tags(self, tags, receipe):
+        """Handle getting or creating tags as needed."""
+        self._add_links(receipe, Tag, tags)
 
     def _get_or_create_ingredients(self, ingredients, receipe):
         """Handle getting or creating ingredients as needed."""
-        auth_user = self.context['request'].user
-        for ingredient in ingredients:
-            ingredient_obj, created = Ingredient.objects.get_or_create(
-                user=auth_user,
-                **ingredient,
-            )
-            receipe.ingredients.add(ingredient_obj)
+        self._add_links(receipe, Ingredient, ingredients)
 
     def create(self, validated_data):
         """Create a recipe."""
         tags = validated_data.pop('tags', [])
         ingredients = validated_data.pop('ingredients', [])
-        receipe = Receipe.objects.create(**validated_data)
-        self._get_or_create_tags(tags, receipe)
-        self._get_or_create_ingredients(ingredients, receipe)
+
+        with transaction.atomic():
+            receipe = Receipe.objects.create(**validated_data)
+            self._get_or_create_tags(tags, receipe)
+            self._get_or_create_ingredients(ingredients, receipe)
 
         return receipe
 
@@ -75,21 +143,172 @@ class ReceipeSerializer(serializers.ModelSerializer):
         tags = validated_data.pop('tags', None)
         ingredients = validated_data.pop('ingredients', None)
 
-        if tags is not None:
-            instance.tags.clear()
-            self._get_or_create_tags(tags, instance)
+        with transaction.atomic():
+            # set() only deletes the links that were dropped and inserts the
+            # new ones, leaving unchanged through rows alone.
+            if tags is not None:
+                instance.tags.set(self._get_or_create_attrs(Tag, tags))
+
+            if ingredients is not None:
+                instance.ingredients.set(
+                    self._get_or_create_attrs(Ingredient, ingredients)
+                )
 
-        if ingredients is not None:
-            instance.ingredients.clear()
-            self._get_or_create_ingredients(ingredients, instance)
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
 
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
+            instance.save()
 
-        instance.save()
         return instance
 
 
+class SimilarReceipeSerializer(ReceipeSerializer):
+    """Serializer for a receipe with its similarity to another one."""
+    similarity = serializers.FloatField(read_only=True)
+
+    class Meta(ReceipeSerializer.Meta):
+        fields = ReceipeSerializer.Meta.fields + ['similarity']
+
+
+class ReceipeListFastSerializer:
+    """
+    Read-only fast path producing ReceipeSerializer output for a page of
+    `.values()` rows, fetching each nested relation in one batched query
+    instead of building model instances and per-row serializers.
+    """
+    serializer_class = ReceipeSerializer
+    relation_models = {'tags': Tag, 'ingredients': Ingredient}
+
+    def __init__(self, rows, fields=None, **kwargs):
+        self.rows = rows
+        self.fields = self.serializer_class(fields=fields).fields
+
+    @classmethod
+    def value_fields(cls, fields):
+        """Return the model columns to select for the given fields."""
+        expandable = cls.serializer_class.expandable_fields
+        return [name for name in fields if name not in expandable]
+
+    def _related(self, name, receipe_ids):
+        """Map receipe ids to the representation of one nested relation."""
+        child_fields = self.fields[name].child.fields
+        through, column = receipe_links(self.relation_models[name])
+        attr = column[:-len('_id')]
+        links = through.objects.filter(
+            receipe_id__in=receipe_ids,
+        ).order_by(column).values_list(
+            'receipe_id',
+            *[f'{attr}__{field_name}' for field_name in child_fields],
+        )
+
+        related = {}
+        for receipe_id, *values in links:
+            related.setdefault(receipe_id, []).append(OrderedDict(
+                (field_name, field.to_representation(value))
+                for (field_name, field), value
+                in zip(child_fields.items(), values)
+            ))
+        return related
+
+    @property
+    def data(self):
+        receipe_ids = [row['id'] for row in self.rows]
+        related = {
+            name: self._related(name, receipe_ids) if receipe_ids else {}
+            for name in self.fields if name in self.relation_models
+        }
+
+        ret = []
+        for row in self.rows:
+            item = OrderedDict()
+            for name, field in self.fields.items():
+                if name in related:
+                    item[name] = related[name].get(row['id'], [])
+                elif row[name] is None:
+                    item[name] = None
+                else:
+                    item[name] = field.to_representation(row[name])
+            ret.append(item)
+
+        return ReturnList(ret, serializer=self)
+
+
+class ReceipeBulkListSerializer(serializers.ListSerializer):
+    """
+    Create many receipes at once, resolving every tag and ingredient
+    named in the payload in one pass and inserting receipes and their
+    links with bulk queries inside one transaction.
+    """
+
+    def to_internal_value(self, data):
+        """Reject payloads above RECEIPE_BULK_MAX_ITEMS before validating."""
+        max_items = settings.RECEIPE_BULK_MAX_ITEMS
+        if isinstance(data, list) and len(data) > max_items:
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    f'Ensure this list has no more than {max_items} items.'
+                ],
+            })
+
+        return super().to_internal_value(data)
+
+    def _resolve(self, model, items, field_name):
+        """Map names to the user's rows for one relation of all items."""
+        names = [attr for item in items for attr in item[field_name]]
+        objs = self.child._get_or_create_attrs(model, names)
+        return {obj.name: obj for obj in objs}
+
+    def _insert_receipes(self, receipes):
+        """Insert receipes, setting their primary keys."""
+        if connection.features.can_return_rows_from_bulk_insert:
+            return Receipe.objects.bulk_create(receipes)
+
+        # Backends that can't return ids from a bulk insert (SQLite) fall
+        # back to one insert per receipe.
+        for receipe in receipes:
+            receipe.save()
+        return receipes
+
+    def create(self, validated_data):
+        """Create the receipes with their tags and ingredients."""
+        items = [
+            {
+                'tags': attrs.pop('tags', []),
+                'ingredients': attrs.pop('ingredients', []),
+            }
+            for attrs in validated_data
+        ]
+
+        with transaction.atomic():
+            tags = self._resolve(Tag, items, 'tags')
+            ingredients = self._resolve(Ingredient, items, 'ingredients')
+            receipes = self._insert_receipes(
+                [Receipe(**attrs) for attrs in validated_data]
+            )
+
+            for field_name, objs in [
+                ('tags', tags), ('ingredients', ingredients),
+            ]:
+                through, column = receipe_links(
+                    Receipe._meta.get_field(field_name).related_model
+                )
+                through.objects.bulk_create([
+                    through(receipe_id=receipe.id, **{column: objs[name].id})
+                    for receipe, item in zip(receipes, items)
+                    for name in dict.fromkeys(
+                        attr['name'] for attr in item[field_name]
+                    )
+                ])
+
+        # Bulk inserts send no signals, so invalidate cached lists and the
+        # similarity index here.
+        if receipes:
+            bump_generation(receipes[0].user_id)
+            similarity.invalidate(receipes[0].user_id)
+
+        return receipes
+
+
 class ReceipeDetailSerializer(ReceipeSerializer):
     """
     Serializer for receipe detail view
@@ -97,6 +316,28 @@ class ReceipeDetailSerializer(ReceipeSerializer):
 
     class Meta(ReceipeSerializer.Meta):
         fields = ReceipeSerializer.Meta.fields + ['description']
+        list_serializer_class = ReceipeBulkListSerializer
+
+
+class ReceipeBulkDeleteSerializer(serializers.Serializer):
+    """Serializer for the receipes to delete in the background."""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+    )
+
+
+class FacetSerializer(serializers.Serializer):
+    """Serializer for the receipe count of a tag or ingredient."""
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    count = serializers.IntegerField()
+
+
+class ReceipeFacetsSerializer(serializers.Serializer):
+    """Serializer for the tag and ingredient counts of receipes."""
+    tags = FacetSerializer(many=True)
+    ingredients = FacetSerializer(many=True)
 
 
 class ReceipeImageSerializer(serializers.ModelSerializer):
@@ -107,3 +348,10 @@ class ReceipeImageSerializer(serializers.ModelSerializer):
         fields = ['id', 'image']
         read_only_fields = ['id']
         extra_kwargs = {'image': {'required': 'True'}}
+
+
+class ReceipeExportSerializer(ReceipeListFastSerializer):
+    """
+    Fast read-only serializer rendering full receipe details for exports
+    """
+    serializer_class = ReceipeDetailSerializer
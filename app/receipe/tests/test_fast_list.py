@@ -0,0 +1,105 @@
+"""
+Parity tests for the fast receipe list path.
+"""
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Receipe, Tag, Ingredient
+
+from receipe.serializers import ReceipeSerializer
+
+
+RECEIPES_URL = reverse('receipe:receipe-list')
+
+
+class FastListParityTests(TestCase):
+    """Test the fast list renders exactly like ReceipeSerializer."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'test123',
+        )
+        self.client.force_authenticate(self.user)
+
+        tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ['Vegan', 'Dîner', 'Quick']
+        ]
+        ingredients = [
+            Ingredient.objects.create(user=self.user, name=name)
+            for name in ['Salt', 'Crème fraîche']
+        ]
+        prices = [Decimal('0.50'), Decimal('5'), Decimal('999.99')]
+        for i, price in enumerate(prices):
+            receipe = Receipe.objects.create(
+                user=self.user,
+                title=f'Receipe “{i}”',
+                time_minutes=i * 7,
+                price=price,
+                link='' if i else 'https://example.com/r.pdf',
+                description='Not rendered in lists',
+            )
+            receipe.tags.add(*tags[i:])
+            receipe.ingredients.add(*ingredients[:i])
+
+    def assertParity(self, params=None):
+        """Assert both list paths return identical bytes for params."""
+        cache.clear()
+        with override_settings(RECEIPE_FAST_LIST=False):
+            expected = self.client.get(RECEIPES_URL, params)
+        cache.clear()
+        with override_settings(RECEIPE_FAST_LIST=True):
+            actual = self.client.get(RECEIPES_URL, params)
+
+        self.assertEqual(expected.status_code, status.HTTP_200_OK)
+        self.assertEqual(actual.status_code, status.HTTP_200_OK)
+        self.assertEqual(actual.content, expected.content)
+
+    def test_parity_full_list(self):
+        """Test parity of the default list output."""
+        self.assertParity()
+
+    def test_parity_sparse_and_expanded(self):
+        """Test parity with sparse fields and expansion."""
+        self.assertParity({'fields': 'id,title,time_minutes'})
+        self.assertParity({'fields': 'price', 'expand': 'ingredients'})
+
+    def test_parity_filtered_and_paginated(self):
+        """Test parity with filters and cursor pages."""
+        tag = Tag.objects.get(user=self.user, name='Quick')
+        self.assertParity({'tags': str(tag.id), 'page_size': 2})
+
+    def test_parity_empty_list(self):
+        """Test parity for a user without receipes."""
+        Receipe.objects.filter(user=self.user).delete()
+        self.assertParity()
+
+    @override_settings(RECEIPE_FAST_LIST=True)
+    @patch.object(ReceipeSerializer, 'to_representation')
+    def test_fast_list_bypasses_model_serializer(self, to_representation):
+        """Test the fast path runs one query per rendered relation."""
+        with self.assertNumQueries(4):
+            res = self.client.get(RECEIPES_URL)
+
+        self.assertEqual(len(res.data['results']), 3)
+        to_representation.assert_not_called()
+
+    @override_settings(RECEIPE_FAST_LIST=True)
+    def test_fast_list_skips_unrendered_columns(self):
+        """Test the fast path never selects description or image."""
+        with self.assertNumQueries(2) as queries:
+            self.client.get(RECEIPES_URL, {'fields': 'id,title'})
+
+        page_sql = queries.captured_queries[-1]['sql']
+        self.assertNotIn('description', page_sql)
+        self.assertNotIn('image', page_sql)
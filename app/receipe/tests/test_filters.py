@@ -0,0 +1,37 @@
+"""
+Tests for receipe filters.
+"""
+from django.test import TestCase
+
+from core.models import Receipe, Tag, Ingredient
+
+from receipe.filters import (
+    MATCH_ALL,
+    filter_assigned,
+    filter_receipes_by,
+)
+
+
+class FilterQueryTests(TestCase):
+    """Test the SQL generated by receipe filters."""
+
+    def test_receipe_filters_use_exists(self):
+        """Test tag and ingredient filters are EXISTS probes."""
+        queryset = filter_receipes_by(Receipe.objects.all(), Tag, [1, 2])
+        queryset = filter_receipes_by(
+            queryset, Ingredient, [3, 4], mode=MATCH_ALL,
+        )
+        sql = str(queryset.query).upper()
+
+        self.assertEqual(sql.count('EXISTS'), 3)
+        self.assertNotIn('DISTINCT', sql)
+        self.assertNotIn('JOIN', sql)
+
+    def test_assigned_filter_uses_exists(self):
+        """Test the assigned filter is an EXISTS probe."""
+        for model in [Tag, Ingredient]:
+            sql = str(filter_assigned(model.objects.all()).query).upper()
+
+            self.assertIn('EXISTS', sql)
+            self.assertNotIn('DISTINCT', sql)
+            self.assertNotIn('JOIN', sql)
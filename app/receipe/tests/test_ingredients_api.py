@@ -3,6 +3,7 @@ Tests for the ingredients API.
 """
 from decimal import Decimal
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.urls import reverse
 from django.test import TestCase
 
@@ -46,6 +47,7 @@ class PrivateIngredientsApiTests(TestCase):
     """Test authenticated API requests."""
 
     def setUp(self):
+        cache.clear()
         self.user = create_user()
         self.client = APIClient()
         self.client.force_authenticate(self.user)
@@ -60,7 +62,7 @@ class PrivateIngredientsApiTests(TestCase):
         ingredients = Ingredient.objects.all().order_by('-name')
         serializer = IngredientSerializer(ingredients, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_ingredients_limited_to_user(self):
         """Test list of ingredients is limited to authenticated user."""
@@ -71,9 +73,9 @@ class PrivateIngredientsApiTests(TestCase):
         res = self.client.get(INGREDIENTS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], ingredient.name)
-        self.assertEqual(res.data[0]['id'], ingredient.id)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], ingredient.name)
+        self.assertEqual(res.data['results'][0]['id'], ingredient.id)
 
     def test_update_ingredient(self):
         """
@@ -87,6 +89,19 @@ class PrivateIngredientsApiTests(TestCase):
         ingredient.refresh_from_db()
         self.assertEqual(ingredient.name, payload['name'])
 
+    def test_update_ingredient_duplicate_name_error(self):
+        """Test renaming to an existing name returns an error."""
+        Ingredient.objects.create(user=self.user, name='Salt')
+        ingredient = Ingredient.objects.create(user=self.user, name='Pepper')
+        payload = {'name': 'Salt'}
+        url = detail_url(ingredient.id)
+        res = self.client.patch(url, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('name', res.data)
+        ingredient.refresh_from_db()
+        self.assertEqual(ingredient.name, 'Pepper')
+
     def test_delete_ingredient(self):
         """
         Test for deleting the ingredients
@@ -114,8 +129,8 @@ class PrivateIngredientsApiTests(TestCase):
 
         s1 = IngredientSerializer(in1)
         s2 = IngredientSerializer(in2)
-        self.assertIn(s1.data, res.data)
-        self.assertNotIn(s2.data, res.data)
+        self.assertIn(s1.data, res.data['results'])
+        self.assertNotIn(s2.data, res.data['results'])
 
     def test_filtered_ingredients_unique(self):
         """Test filtered ingredients returns a unique list."""
@@ -138,4 +153,59 @@ class PrivateIngredientsApiTests(TestCase):
 
         res = self.client.get(INGREDIENTS_URL, {'assigned_only': 1})
 
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_autocomplete_ingredients(self):
+        """Test ?q= matches ingredients combined with assigned_only."""
+        garlic = Ingredient.objects.create(user=self.user, name='Garlic')
+        Ingredient.objects.create(user=self.user, name='Garam Masala')
+        receipe = Receipe.objects.create(
+            title='Garlic Bread',
+            time_minutes=10,
+            price=Decimal('2.00'),
+            user=self.user,
+        )
+        receipe.ingredients.add(garlic)
+
+        res = self.client.get(INGREDIENTS_URL, {'q': 'gar'})
+        self.assertEqual(
+            [i['name'] for i in res.data['results']],
+            ['Garam Masala', 'Garlic'],
+        )
+
+        res = self.client.get(
+            INGREDIENTS_URL, {'q': 'gar', 'assigned_only': 1},
+        )
+        self.assertEqual(
+            [i['name'] for i in res.data['results']],
+            ['Garlic'],
+        )
+
+    def test_ingredients_recipe_count(self):
+        """Test ?recipe_count=1 combined with assigned_only."""
+        salt = Ingredient.objects.create(user=self.user, name='Salt')
+        Ingredient.objects.create(user=self.user, name='Pepper')
+        other = Receipe.objects.create(
+            title='Chips',
+            time_minutes=20,
+            price=Decimal('3.00'),
+            user=get_user_model().objects.create_user('other@example.com'),
+        )
+        other.ingredients.add(
+            Ingredient.objects.create(user=other.user, name='Salt'),
+        )
+        receipe = Receipe.objects.create(
+            title='Crisps',
+            time_minutes=5,
+            price=Decimal('1.00'),
+            user=self.user,
+        )
+        receipe.ingredients.add(salt)
+
+        res = self.client.get(
+            INGREDIENTS_URL, {'recipe_count': 1, 'assigned_only': 1},
+        )
+
+        self.assertEqual(res.data['results'], [
+            {'id': salt.id, 'name': 'Salt', 'recipe_count': 1},
+        ])
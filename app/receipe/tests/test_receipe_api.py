@@ -1,25 +1,42 @@
 """
 Tests for receipe APIs.
 """
+import base64
+import csv
+import io
+import json
 import tempfile
 import os
+from unittest import skipUnless
+from unittest.mock import patch
 
+import msgpack
 from PIL import Image
 from decimal import Decimal
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils.http import http_date
 
 from rest_framework import status
+from rest_framework.authtoken.models import Token
 from rest_framework.test import APIClient
 
-from core.models import Receipe, Tag, Ingredient
+from core import similarity
+from core.models import DeletionJob, Receipe, Tag, Ingredient
 
 from receipe.serializers import ReceipeSerializer, ReceipeDetailSerializer
 
 
 RECEIPES_URL = reverse('receipe:receipe-list')
+EXPORT_URL = reverse('receipe:receipe-export')
+BULK_URL = reverse('receipe:receipe-bulk')
+BULK_DELETE_URL = reverse('receipe:receipe-bulk-delete')
+FACETS_URL = reverse('receipe:receipe-facets')
 
 
 def detail_url(receipe_id):
@@ -29,6 +46,11 @@ def detail_url(receipe_id):
     return reverse('receipe:receipe-detail', args=[receipe_id])
 
 
+def similar_url(receipe_id):
+    """Create and return a similar receipes url."""
+    return reverse('receipe:receipe-similar', args=[receipe_id])
+
+
 def image_upload_url(receipe_id):
     """Create and return an image upload URL."""
     return reverse('receipe:receipe-upload-image', args=[receipe_id])
@@ -71,6 +93,7 @@ class PrivateReceipeApiTests(TestCase):
     """Test authenticated API requests."""
 
     def setUp(self):
+        cache.clear()
         self.client = APIClient()
         self.user = create_user(email='user@example.com', password='test123')
         self.client.force_authenticate(self.user)
@@ -85,7 +108,7 @@ class PrivateReceipeApiTests(TestCase):
         receipes = Receipe.objects.all().order_by('-id')
         serializer = ReceipeSerializer(receipes, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_receipe_list_limited_to_user(self):
         """Test list of receipes is limited to authenticated user."""
@@ -98,7 +121,56 @@ class PrivateReceipeApiTests(TestCase):
         receipes = Receipe.objects.filter(user=self.user)
         serializer = ReceipeSerializer(receipes, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
+
+    def test_list_receipes_query_count_constant(self):
+        """Test listing receipes loads tags and ingredients in bulk."""
+        for i in range(5):
+            receipe = create_receipe(user=self.user, title=f'Receipe {i}')
+            receipe.tags.add(
+                Tag.objects.create(user=self.user, name=f'Tag {i}')
+            )
+            receipe.ingredients.add(
+                Ingredient.objects.create(user=self.user, name=f'Ing {i}')
+            )
+
+        with self.assertNumQueries(4):
+            res = self.client.get(RECEIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 5)
+
+    def test_list_receipes_paginated_by_cursor(self):
+        """Test walking the receipe list page by page with cursors."""
+        receipes = [
+            create_receipe(user=self.user, title=f'Receipe {i}')
+            for i in range(5)
+        ]
+
+        res = self.client.get(RECEIPES_URL, {'page_size': 2})
+        seen = [r['id'] for r in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            seen.extend(r['id'] for r in res.data['results'])
+
+        expected = sorted((r.id for r in receipes), reverse=True)
+        self.assertEqual(seen, expected)
+        self.assertIsNotNone(res.data['previous'])
+
+    def test_list_receipes_page_size_capped(self):
+        """Test clients cannot request pages above the maximum size."""
+        create_receipe(user=self.user)
+
+        res = self.client.get(RECEIPES_URL, {'page_size': 100000})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_list_receipes_invalid_cursor(self):
+        """Test an invalid cursor returns not found."""
+        res = self.client.get(RECEIPES_URL, {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
 
     def test_get_receipe_detail(self):
         """
@@ -111,6 +183,72 @@ class PrivateReceipeApiTests(TestCase):
         serializer = ReceipeDetailSerializer(receipe)
         self.assertEqual(res.data, serializer.data)
 
+    def test_list_sparse_fields(self):
+        """Test ?fields= narrows the output and skips nested relations."""
+        receipe = create_receipe(user=self.user)
+        receipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+
+        params = {'fields': 'id,title,time_minutes'}
+        with self.assertNumQueries(2):
+            res = self.client.get(RECEIPES_URL, params)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data['results'],
+            [{
+                'id': receipe.id,
+                'title': receipe.title,
+                'time_minutes': receipe.time_minutes,
+            }],
+        )
+
+    def test_list_expand_selected_relation(self):
+        """Test ?expand= adds only the requested nested relations."""
+        receipe = create_receipe(user=self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        receipe.tags.add(tag)
+
+        params = {'fields': 'id,title', 'expand': 'tags'}
+        with self.assertNumQueries(3):
+            res = self.client.get(RECEIPES_URL, params)
+
+        self.assertEqual(
+            res.data['results'],
+            [{
+                'id': receipe.id,
+                'title': receipe.title,
+                'tags': [{'id': tag.id, 'name': tag.name}],
+            }],
+        )
+
+    def test_list_expand_without_fields(self):
+        """Test ?expand= alone keeps every scalar field."""
+        create_receipe(user=self.user)
+
+        res = self.client.get(RECEIPES_URL, {'expand': 'ingredients'})
+
+        self.assertEqual(
+            list(res.data['results'][0]),
+            ['id', 'title', 'time_minutes', 'price', 'link', 'ingredients'],
+        )
+
+    def test_detail_sparse_fields(self):
+        """Test ?fields= narrows the receipe detail output."""
+        receipe = create_receipe(user=self.user)
+
+        params = {'fields': 'title,description,unknown'}
+        res = self.client.get(detail_url(receipe.id), params)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data,
+            {
+                'id': receipe.id,
+                'title': receipe.title,
+                'description': receipe.description,
+            },
+        )
+
     def test_create_receipe(self):
         """Test creating a receipe."""
         payload = {
@@ -126,6 +264,28 @@ class PrivateReceipeApiTests(TestCase):
             self.assertEqual(getattr(receipe, k), v)
         self.assertEqual(receipe.user, self.user)
 
+    def test_create_and_list_msgpack(self):
+        """Test MessagePack request and response bodies."""
+        payload = {
+            'title': 'Sample receipe',
+            'time_minutes': 30,
+            'price': '5.99',
+            'tags': [{'name': 'Quick'}],
+        }
+        res = self.client.post(
+            RECEIPES_URL,
+            msgpack.packb(payload),
+            content_type='application/msgpack',
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        res = self.client.get(RECEIPES_URL, HTTP_ACCEPT='application/msgpack')
+
+        self.assertEqual(res['Content-Type'], 'application/msgpack')
+        data = msgpack.unpackb(res.content, raw=False)
+        self.assertEqual(data['results'][0]['title'], payload['title'])
+        self.assertEqual(data['results'][0]['price'], '5.99')
+
     def test_partial_update(self):
         """Test partial update of a receipe."""
         original_link = 'https://example.com/receipe.pdf'
@@ -203,6 +363,25 @@ class PrivateReceipeApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
         self.assertTrue(Receipe.objects.filter(id=receipe.id).exists())
 
+    def test_create_receipe_retry_with_idempotency_key(self):
+        """Test retrying a create with the same key creates one receipe."""
+        cache.clear()
+        payload = {
+            'title': 'Sample receipe',
+            'time_minutes': 30,
+            'price': Decimal('5.99'),
+        }
+        first = self.client.post(
+            RECEIPES_URL, payload, HTTP_IDEMPOTENCY_KEY='create-1',
+        )
+        retry = self.client.post(
+            RECEIPES_URL, payload, HTTP_IDEMPOTENCY_KEY='create-1',
+        )
+
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(Receipe.objects.filter(user=self.user).count(), 1)
+
     def test_create_receipe_with_new_tags(self):
         """Test creating a receipe with new tags."""
         payload = {
@@ -249,6 +428,49 @@ class PrivateReceipeApiTests(TestCase):
             ).exists()
             self.assertTrue(exists)
 
+    def test_create_receipe_query_count_independent_of_items(self):
+        """Test creating tags and ingredients is a fixed number of queries."""
+        Tag.objects.create(user=self.user, name='Tag 0')
+        Ingredient.objects.create(user=self.user, name='Ingredient 0')
+
+        queries = []
+        for count in [2, 20]:
+            payload = {
+                'title': f'Receipe with {count} items',
+                'time_minutes': 30,
+                'price': Decimal('2.50'),
+                'tags': [{'name': f'Tag {i}'} for i in range(count)],
+                'ingredients': [
+                    {'name': f'Ingredient {i}'} for i in range(count)
+                ],
+            }
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.post(RECEIPES_URL, payload, format='json')
+            queries.append(len(ctx))
+
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            receipe = Receipe.objects.get(id=res.data['id'])
+            self.assertEqual(receipe.tags.count(), count)
+            self.assertEqual(receipe.ingredients.count(), count)
+
+        # The count itself depends on the database: only PostgreSQL gets
+        # the inserted tags back without reading them again.
+        self.assertEqual(queries[0], queries[1])
+
+    def test_create_receipe_with_repeated_tag(self):
+        """Test a tag named twice in a payload is linked once."""
+        payload = {
+            'title': 'Thai Prawn Curry',
+            'time_minutes': 30,
+            'price': Decimal('2.50'),
+            'tags': [{'name': 'Thai'}, {'name': 'Thai'}],
+        }
+        res = self.client.post(RECEIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(len(res.data['tags']), 1)
+
     def test_create_tag_on_update(self):
         """Test create tag when updating a receipe."""
         receipe = create_receipe(user=self.user)
@@ -289,6 +511,44 @@ class PrivateReceipeApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(receipe.tags.count(), 0)
 
+    def test_update_receipe_tags_keeps_unchanged_links(self):
+        """Test updating tags only rewrites the links that changed."""
+        tag_thai = Tag.objects.create(user=self.user, name='Thai')
+        tag_spicy = Tag.objects.create(user=self.user, name='Spicy')
+        receipe = create_receipe(user=self.user)
+        receipe.tags.add(tag_thai, tag_spicy)
+        through = Receipe.tags.through
+        kept_link = through.objects.get(receipe=receipe, tag=tag_thai)
+
+        payload = {'tags': [{'name': 'Thai'}, {'name': 'Dinner'}]}
+        url = detail_url(receipe.id)
+        res = self.client.patch(url, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(through.objects.filter(id=kept_link.id).exists())
+        self.assertEqual(
+            set(receipe.tags.values_list('name', flat=True)),
+            {'Thai', 'Dinner'},
+        )
+
+    def test_update_receipe_same_tags_deletes_no_links(self):
+        """Test resending the same tags leaves the through table alone."""
+        tag = Tag.objects.create(user=self.user, name='Thai')
+        receipe = create_receipe(user=self.user)
+        receipe.tags.add(tag)
+
+        payload = {'tags': [{'name': 'Thai'}]}
+        url = detail_url(receipe.id)
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.patch(url, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertFalse([
+            query for query in ctx.captured_queries
+            if 'core_receipe_tags' in query['sql']
+            and query['sql'].startswith(('DELETE', 'INSERT'))
+        ])
+
     def test_create_receipe_with_new_ingredients(self):
         """Test creating a receipe with new ingredients."""
         payload = {
@@ -395,9 +655,9 @@ class PrivateReceipeApiTests(TestCase):
         s2 = ReceipeSerializer(r2)
         s3 = ReceipeSerializer(r3)
 
-        self.assertIn(s1.data, res.data)
-        self.assertIn(s2.data, res.data)
-        self.assertNotIn(s3.data, res.data)
+        self.assertIn(s1.data, res.data['results'])
+        self.assertIn(s2.data, res.data['results'])
+        self.assertNotIn(s3.data, res.data['results'])
 
     def test_filter_by_ingredients(self):
         """
@@ -419,9 +679,901 @@ class PrivateReceipeApiTests(TestCase):
         s2 = ReceipeSerializer(r2)
         s3 = ReceipeSerializer(r3)
 
-        self.assertIn(s1.data, res.data)
-        self.assertIn(s2.data, res.data)
-        self.assertNotIn(s3.data, res.data)
+        self.assertIn(s1.data, res.data['results'])
+        self.assertIn(s2.data, res.data['results'])
+        self.assertNotIn(s3.data, res.data['results'])
+
+    def test_filter_by_all_tags(self):
+        """
+        Test Filtering Receipes carrying all of the given tags
+        """
+        r1 = create_receipe(user=self.user, title='Vegan Curry')
+        r2 = create_receipe(user=self.user, title='Vegan Salad')
+        tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        tag2 = Tag.objects.create(user=self.user, name='Dinner')
+        r1.tags.add(tag1, tag2)
+        r2.tags.add(tag1)
+
+        params = {'tags': f'{tag1.id},{tag2.id}', 'tags_mode': 'all'}
+        res = self.client.get(RECEIPES_URL, params)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        ids = [r['id'] for r in res.data['results']]
+        self.assertEqual(ids, [r1.id])
+
+    def test_filter_by_all_ingredients(self):
+        """
+        Test Filtering Receipes containing all of the given ingredients
+        """
+        r1 = create_receipe(user=self.user, title='Omelette')
+        r2 = create_receipe(user=self.user, title='Boiled Egg')
+        in1 = Ingredient.objects.create(user=self.user, name='Egg')
+        in2 = Ingredient.objects.create(user=self.user, name='Cheese')
+        r1.ingredients.add(in1, in2)
+        r2.ingredients.add(in1)
+
+        params = {
+            'ingredients': f'{in1.id},{in2.id}',
+            'ingredients_mode': 'all',
+        }
+        res = self.client.get(RECEIPES_URL, params)
+
+        ids = [r['id'] for r in res.data['results']]
+        self.assertEqual(ids, [r1.id])
+
+    def test_filter_by_any_tags_returns_unique_receipes(self):
+        """
+        Test a receipe matching several tags is listed once
+        """
+        receipe = create_receipe(user=self.user)
+        tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        tag2 = Tag.objects.create(user=self.user, name='Dinner')
+        receipe.tags.add(tag1, tag2)
+
+        params = {'tags': f'{tag1.id},{tag2.id}'}
+        res = self.client.get(RECEIPES_URL, params)
+
+        ids = [r['id'] for r in res.data['results']]
+        self.assertEqual(ids, [receipe.id])
+
+    def test_filter_invalid_mode_error(self):
+        """
+        Test an unknown match mode returns a bad request
+        """
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+
+        params = {'tags': f'{tag.id}', 'tags_mode': 'some'}
+        res = self.client.get(RECEIPES_URL, params)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('tags_mode', res.data)
+
+
+class ConditionalGetTests(TestCase):
+    """Test ETag and Last-Modified handling on receipe reads."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='test123')
+        self.client.force_authenticate(self.user)
+        self.receipe = create_receipe(user=self.user)
+
+    def test_list_not_modified(self):
+        """Test a fresh ETag on the list returns 304 without a body."""
+        res = self.client.get(RECEIPES_URL)
+        etag = res['ETag']
+        self.assertNotIn('Last-Modified', res)
+        cache.clear()
+
+        with self.assertNumQueries(1):
+            res = self.client.get(RECEIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res.content, b'')
+
+    def test_list_if_modified_since_after_delete(self):
+        """Test If-Modified-Since alone never hides a deleted receipe."""
+        other = create_receipe(user=self.user)
+        self.client.get(RECEIPES_URL)
+        since = http_date(other.modified_at.timestamp() + 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            other.delete()
+        res = self.client.get(RECEIPES_URL, HTTP_IF_MODIFIED_SINCE=since)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [receipe['id'] for receipe in res.data['results']],
+            [self.receipe.id],
+        )
+
+    def test_list_modified_after_create_and_delete(self):
+        """Test creating or deleting a receipe changes the list ETag."""
+        etag = self.client.get(RECEIPES_URL)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            other = create_receipe(user=self.user)
+        res = self.client.get(RECEIPES_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        etag = res['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            other.delete()
+        res = self.client.get(RECEIPES_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_list_etag_depends_on_query(self):
+        """Test a different query string does not reuse the ETag."""
+        etag = self.client.get(RECEIPES_URL)['ETag']
+
+        res = self.client.get(
+            RECEIPES_URL, {'fields': 'id'}, HTTP_IF_NONE_MATCH=etag,
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_detail_not_modified(self):
+        """Test a fresh ETag on the detail returns 304."""
+        url = detail_url(self.receipe.id)
+        etag = self.client.get(url)['ETag']
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_detail_modified_by_tag_changes(self):
+        """Test adding, renaming and deleting tags changes the ETag."""
+        url = detail_url(self.receipe.id)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        etags = [self.client.get(url)['ETag']]
+
+        self.receipe.tags.add(tag)
+        etags.append(self.client.get(url)['ETag'])
+        tag.name = 'Vegetarian'
+        tag.save()
+        etags.append(self.client.get(url)['ETag'])
+        tag.delete()
+        etags.append(self.client.get(url)['ETag'])
+
+        self.assertEqual(len(set(etags)), len(etags))
+
+    def test_detail_missing_returns_not_found(self):
+        """Test conditional headers do not hide a missing receipe."""
+        res = self.client.get(detail_url(0), HTTP_IF_NONE_MATCH='"x"')
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_detail_invalid_id_returns_not_found(self):
+        """Test a non-numeric receipe id returns 404."""
+        res = self.client.get(detail_url('abc'))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ListCacheTests(TestCase):
+    """Test receipe list responses are cached per user."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='test123')
+        self.client.force_authenticate(self.user)
+        self.receipe = create_receipe(user=self.user)
+
+    def test_list_served_from_cache(self):
+        """Test a repeated list request runs no queries."""
+        res = self.client.get(RECEIPES_URL)
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(RECEIPES_URL)
+
+        self.assertEqual(cached.status_code, status.HTTP_200_OK)
+        self.assertEqual(cached.data, res.data)
+        self.assertEqual(cached['ETag'], res['ETag'])
+
+    def test_cached_list_not_modified(self):
+        """Test a cache hit still answers conditional requests."""
+        etag = self.client.get(RECEIPES_URL)['ETag']
+
+        with self.assertNumQueries(0):
+            res = self.client.get(RECEIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_cache_invalidated_by_writes(self):
+        """Test saves, deletes and link changes invalidate the cache."""
+        self.client.get(RECEIPES_URL)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.receipe.tags.add(tag)
+        res = self.client.get(RECEIPES_URL)
+        self.assertEqual(res.data['results'][0]['tags'][0]['name'], 'Vegan')
+
+        tag.name = 'Vegetarian'
+        with self.captureOnCommitCallbacks(execute=True):
+            tag.save()
+        res = self.client.get(RECEIPES_URL)
+        self.assertEqual(
+            res.data['results'][0]['tags'][0]['name'], 'Vegetarian',
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.receipe.delete()
+        res = self.client.get(RECEIPES_URL)
+        self.assertEqual(res.data['results'], [])
+
+    def test_cache_separate_per_user(self):
+        """Test a cached list is never served to another user."""
+        self.client.get(RECEIPES_URL)
+        other_user = create_user(email='other@example.com', password='pass123')
+        self.client.force_authenticate(other_user)
+
+        res = self.client.get(RECEIPES_URL)
+
+        self.assertEqual(res.data['results'], [])
+
+
+class ExportTests(TestCase):
+    """Test streaming receipe exports."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='test123')
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.receipes = []
+        for i in range(5):
+            receipe = create_receipe(user=self.user, title=f'Receipe {i}')
+            if i % 2:
+                receipe.tags.add(self.tag)
+            self.receipes.append(receipe)
+        create_receipe(user=create_user(email='other@example.com'))
+
+    def test_export_ndjson(self):
+        """Test exporting receipes as newline delimited JSON."""
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(res.streaming_content).decode().splitlines()
+        expected = ReceipeDetailSerializer(
+            Receipe.objects.filter(user=self.user).order_by('-id'),
+            many=True,
+        ).data
+        self.assertEqual([json.loads(line) for line in lines], expected)
+
+    @override_settings(RECEIPE_EXPORT_CHUNK_SIZE=2)
+    def test_export_batches_relations_per_chunk(self):
+        """Test tags and ingredients are fetched once per chunk."""
+        res = self.client.get(EXPORT_URL)
+
+        with self.assertNumQueries(1 + 3 * 2):
+            lines = b''.join(res.streaming_content).splitlines()
+
+        self.assertEqual(len(lines), 5)
+
+    def test_export_filtered(self):
+        """Test exports honour the list filters."""
+        res = self.client.get(EXPORT_URL, {'tags': str(self.tag.id)})
+
+        lines = b''.join(res.streaming_content).splitlines()
+        ids = [json.loads(line)['id'] for line in lines]
+        self.assertEqual(ids, [self.receipes[3].id, self.receipes[1].id])
+
+    def test_export_csv(self):
+        """Test exporting receipes as CSV."""
+        res = self.client.get(EXPORT_URL, {'format': 'csv'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['Content-Type'].startswith('text/csv'))
+        content = b''.join(res.streaming_content).decode()
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[1]['title'], 'Receipe 3')
+        self.assertEqual(rows[1]['tags'], 'Vegan')
+        self.assertEqual(rows[1]['price'], '5.25')
+
+
+class BulkCreateTests(TestCase):
+    """Test creating many receipes in one request."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='test123')
+        self.client.force_authenticate(self.user)
+
+    def _payload(self, count, **params):
+        return [
+            {
+                'title': f'Receipe {i}',
+                'time_minutes': 10 + i,
+                'price': '5.25',
+                'tags': [{'name': 'Vegan'}, {'name': f'Tag {i % 2}'}],
+                'ingredients': [{'name': 'Salt'}],
+                **params,
+            }
+            for i in range(count)
+        ]
+
+    def test_bulk_create(self):
+        """Test creating receipes with shared tags and ingredients."""
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.post(BULK_URL, self._payload(3), format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([r['title'] for r in res.data], [
+            'Receipe 0', 'Receipe 1', 'Receipe 2',
+        ])
+        receipes = Receipe.objects.filter(user=self.user).order_by('id')
+        self.assertEqual(receipes.count(), 3)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 3)
+        self.assertEqual(Ingredient.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(
+            list(receipes[1].tags.order_by('name').values_list(
+                'name', flat=True,
+            )),
+            ['Tag 1', 'Vegan'],
+        )
+        self.assertEqual(res.data, ReceipeDetailSerializer(
+            receipes, many=True,
+        ).data)
+
+    def test_bulk_create_reports_item_errors(self):
+        """Test invalid items are reported by position and nothing saved."""
+        payload = self._payload(3)
+        payload[1]['title'] = ''
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('title', res.data[1])
+        self.assertEqual(res.data[2], {})
+        self.assertFalse(Receipe.objects.filter(user=self.user).exists())
+
+    @override_settings(RECEIPE_BULK_MAX_ITEMS=2)
+    def test_bulk_create_limit(self):
+        """Test payloads above the configured limit are rejected."""
+        res = self.client.post(BULK_URL, self._payload(3), format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('non_field_errors', res.data)
+        self.assertFalse(Receipe.objects.filter(user=self.user).exists())
+
+    def test_bulk_create_invalidates_list_cache(self):
+        """Test cached lists are refreshed after a bulk create."""
+        self.client.get(RECEIPES_URL)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(BULK_URL, self._payload(2), format='json')
+        res = self.client.get(RECEIPES_URL)
+
+        self.assertEqual(len(res.data['results']), 2)
+
+
+class BulkDeleteTests(TestCase):
+    """Test scheduling receipe deletions."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='test123')
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_delete_schedules_job(self):
+        """Test a bulk delete returns a pending job without deleting."""
+        receipes = [create_receipe(user=self.user) for _ in range(3)]
+        ids = [receipes[1].id, receipes[0].id, receipes[1].id]
+
+        res = self.client.post(BULK_DELETE_URL, {'ids': ids}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(res.data['status'], DeletionJob.STATUS_PENDING)
+        job = DeletionJob.objects.get(id=res.data['id'])
+        self.assertEqual(job.user, self.user)
+        self.assertEqual(job.receipe_ids, [receipes[0].id, receipes[1].id])
+        self.assertEqual(Receipe.objects.filter(user=self.user).count(), 3)
+
+    def test_bulk_delete_requires_ids(self):
+        """Test a bulk delete needs at least one id."""
+        res = self.client.post(BULK_DELETE_URL, {'ids': []}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(DeletionJob.objects.exists())
+
+
+class WriteTransactionTests(TransactionTestCase):
+    """Test receipe writes commit once."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='test123')
+        self.client.force_authenticate(self.user)
+
+    def _commits(self, method, url, payload):
+        """Make a request and return it with the commits it made."""
+        with self.assertLogs('core.transactions', level='DEBUG') as logs:
+            res = getattr(self.client, method)(url, payload, format='json')
+        return res, logs.records[-1].args[-1]
+
+    def test_create_commits_once(self):
+        """Test a create with nested relations is one commit."""
+        payload = {
+            'title': 'Thai Prawn Curry',
+            'time_minutes': 30,
+            'price': Decimal('2.50'),
+            'tags': [{'name': 'Thai'}, {'name': 'Dinner'}],
+            'ingredients': [{'name': 'Prawns'}],
+        }
+        res, commits = self._commits('post', RECEIPES_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(commits, 1)
+
+    def test_update_commits_once(self):
+        """Test an update with nested relations is one commit."""
+        receipe = create_receipe(user=self.user)
+        receipe.tags.add(Tag.objects.create(user=self.user, name='Thai'))
+        payload = {
+            'title': 'New title',
+            'tags': [{'name': 'Dinner'}],
+            'ingredients': [{'name': 'Prawns'}],
+        }
+        res, commits = self._commits('patch', detail_url(receipe.id), payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(commits, 1)
+
+    def test_failed_create_leaves_nothing(self):
+        """Test a failure while linking relations rolls the receipe back."""
+        payload = {
+            'title': 'Thai Prawn Curry',
+            'time_minutes': 30,
+            'price': Decimal('2.50'),
+            'tags': [{'name': 'Thai'}],
+            'ingredients': [{'name': 'Prawns'}],
+        }
+        with patch.object(
+            ReceipeSerializer,
+            '_get_or_create_ingredients',
+            side_effect=RuntimeError,
+        ):
+            with self.assertRaises(RuntimeError):
+                self.client.post(RECEIPES_URL, payload, format='json')
+
+        self.assertFalse(Receipe.objects.exists())
+        self.assertFalse(Tag.objects.exists())
+
+
+class SearchTests(TestCase):
+    """Test searching receipes."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='test123')
+        self.client.force_authenticate(self.user)
+        self.curry = create_receipe(
+            user=self.user,
+            title='Thai Prawn Curry',
+            description='Spicy and quick.',
+        )
+        self.soup = create_receipe(
+            user=self.user,
+            title='Leek Soup',
+            description='Serve with a spoon of curry paste.',
+        )
+        self.pie = create_receipe(user=self.user, title='Apple Pie')
+        create_receipe(
+            user=create_user(email='other@example.com'),
+            title='Other Curry',
+        )
+
+    def _ids(self, res):
+        return [receipe['id'] for receipe in res.data['results']]
+
+    def test_search_title_and_description(self):
+        """Test search matches the user's receipe titles and descriptions."""
+        res = self.client.get(RECEIPES_URL, {'search': 'curry'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            set(self._ids(res)),
+            {self.curry.id, self.soup.id},
+        )
+
+    def test_search_with_tag_filter(self):
+        """Test search combines with the tag filter."""
+        tag = Tag.objects.create(user=self.user, name='Soups')
+        self.soup.tags.add(tag)
+
+        res = self.client.get(
+            RECEIPES_URL, {'search': 'curry', 'tags': str(tag.id)},
+        )
+
+        self.assertEqual(self._ids(res), [self.soup.id])
+
+    @override_settings(RECEIPE_FAST_LIST=True)
+    def test_search_fast_list(self):
+        """Test search results on the fast list path."""
+        res = self.client.get(RECEIPES_URL, {'search': 'curry'})
+
+        self.assertEqual(
+            set(self._ids(res)),
+            {self.curry.id, self.soup.id},
+        )
+
+    def test_search_pages(self):
+        """Test paging through search results returns each match once."""
+        for i in range(3):
+            create_receipe(user=self.user, title=f'Green Curry {i}')
+
+        params = {'search': 'curry', 'page_size': 2}
+        res = self.client.get(RECEIPES_URL, params)
+        ids = self._ids(res)
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            ids += self._ids(res)
+
+        self.assertEqual(len(ids), 5)
+        self.assertEqual(len(set(ids)), 5)
+
+    @skipUnless(connection.vendor == 'postgresql', 'Needs PostgreSQL')
+    def test_search_ranked(self):
+        """Test title matches rank above description matches."""
+        res = self.client.get(RECEIPES_URL, {'search': 'curry'})
+
+        self.assertEqual(self._ids(res), [self.curry.id, self.soup.id])
+
+    @skipUnless(connection.vendor == 'postgresql', 'Needs PostgreSQL')
+    def test_search_vector_maintained(self):
+        """Test the search vector follows title and description changes."""
+        self.pie.title = 'Apple Crumble'
+        self.pie.save()
+        Receipe.objects.filter(id=self.soup.id).update(description='')
+
+        res = self.client.get(RECEIPES_URL, {'search': 'crumble'})
+        self.assertEqual(self._ids(res), [self.pie.id])
+        res = self.client.get(RECEIPES_URL, {'search': 'curry'})
+        self.assertEqual(self._ids(res), [self.curry.id])
+
+    @skipUnless(connection.vendor == 'postgresql', 'Needs PostgreSQL')
+    def test_search_websearch_syntax(self):
+        """Test quoted phrases and exclusions in search text."""
+        res = self.client.get(RECEIPES_URL, {'search': 'curry -prawn'})
+
+        self.assertEqual(self._ids(res), [self.soup.id])
+
+
+class RangeOrderingTests(TestCase):
+    """Test range filters and sort orders of the receipe list."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='test123')
+        self.client.force_authenticate(self.user)
+        self.quick = create_receipe(
+            user=self.user, time_minutes=10, price=Decimal('8.00'),
+        )
+        self.medium = create_receipe(
+            user=self.user, time_minutes=30, price=Decimal('2.50'),
+        )
+        self.slow = create_receipe(
+            user=self.user, time_minutes=90, price=Decimal('4.75'),
+        )
+
+    def _ids(self, res):
+        return [receipe['id'] for receipe in res.data['results']]
+
+    def _all_ids(self, params):
+        res = self.client.get(RECEIPES_URL, params)
+        ids = self._ids(res)
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            ids += self._ids(res)
+        return ids
+
+    def test_filter_time_range(self):
+        """Test filtering receipes by a time_minutes range."""
+        res = self.client.get(RECEIPES_URL, {
+            'time_minutes__gte': '20',
+            'time_minutes__lte': '90',
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self._ids(res), [self.slow.id, self.medium.id])
+
+    def test_filter_invalid_ids(self):
+        """Test non-integer tag and ingredient ids are rejected."""
+        for params in [{'tags': 'abc'}, {'ingredients': '1,two'}]:
+            res = self.client.get(RECEIPES_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(list(params)[0], res.data)
+
+    def test_filter_price_range(self):
+        """Test filtering receipes by a price range."""
+        res = self.client.get(RECEIPES_URL, {'price__lte': '4.75'})
+
+        self.assertEqual(self._ids(res), [self.slow.id, self.medium.id])
+
+    def test_filter_invalid_range(self):
+        """Test invalid range values are rejected."""
+        for params in [
+            {'time_minutes__gte': 'soon'},
+            {'time_minutes__lte': '1.5'},
+            {'price__gte': 'NaN'},
+        ]:
+            res = self.client.get(RECEIPES_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(list(params)[0], res.data)
+
+    def test_ordering(self):
+        """Test sorting receipes by the whitelisted fields."""
+        expected = {
+            'price': [self.medium.id, self.slow.id, self.quick.id],
+            '-price': [self.quick.id, self.slow.id, self.medium.id],
+            'time_minutes': [self.quick.id, self.medium.id, self.slow.id],
+            '-time_minutes': [self.slow.id, self.medium.id, self.quick.id],
+            'id': [self.quick.id, self.medium.id, self.slow.id],
+        }
+        for ordering, ids in expected.items():
+            res = self.client.get(RECEIPES_URL, {'ordering': ordering})
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(self._ids(res), ids, ordering)
+
+    def test_ordering_invalid(self):
+        """Test sorting by a field outside the whitelist is rejected."""
+        res = self.client.get(RECEIPES_URL, {'ordering': 'title'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('ordering', res.data)
+
+    def test_ordering_pages_through_ties(self):
+        """Test sorted pages return every receipe once across ties."""
+        for _ in range(5):
+            create_receipe(user=self.user, price=Decimal('4.75'))
+
+        ids = self._all_ids({'ordering': '-price', 'page_size': 2})
+
+        expected = list(Receipe.objects.filter(
+            user=self.user,
+        ).order_by('-price', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_ordering_previous_page(self):
+        """Test the previous link of a sorted page returns the page before."""
+        for _ in range(3):
+            create_receipe(user=self.user, time_minutes=30)
+
+        params = {'ordering': 'time_minutes', 'page_size': 2}
+        first = self.client.get(RECEIPES_URL, params)
+        second = self.client.get(first.data['next'])
+        res = self.client.get(second.data['previous'])
+
+        self.assertEqual(self._ids(res), self._ids(first))
+        self.assertIsNotNone(res.data['next'])
+
+    def test_ordering_invalid_cursor(self):
+        """Test a malformed sorted cursor returns a 404."""
+        for position in [b'not-json', b'["cheap", "1"]', b'["1.00"]']:
+            res = self.client.get(RECEIPES_URL, {
+                'ordering': 'price',
+                'cursor': base64.b64encode(b'p=' + position).decode(),
+            })
+
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(RECEIPE_FAST_LIST=True)
+    def test_ordering_fast_list_fields(self):
+        """Test sorted pages on the fast path with a sparse fieldset."""
+        ids = self._all_ids({
+            'ordering': 'price',
+            'fields': 'title',
+            'page_size': 1,
+        })
+
+        self.assertEqual(ids, [self.medium.id, self.slow.id, self.quick.id])
+
+    def test_ordering_sparse_fields_queries(self):
+        """Test sorting by a field outside ?fields= does not defer it."""
+        for _ in range(3):
+            create_receipe(user=self.user)
+        params = {'fields': 'title', 'page_size': 2}
+
+        with CaptureQueriesContext(connection) as unsorted:
+            self.client.get(RECEIPES_URL, params)
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(
+                RECEIPES_URL, {**params, 'ordering': 'price'},
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(ctx), len(unsorted))
+
+
+class FacetTests(TestCase):
+    """Test the tag and ingredient counts of the receipe list."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='test123')
+        self.client.force_authenticate(self.user)
+        self.vegan = Tag.objects.create(user=self.user, name='Vegan')
+        self.quick = Tag.objects.create(user=self.user, name='Quick')
+        self.salt = Ingredient.objects.create(user=self.user, name='Salt')
+
+        self.curry = create_receipe(
+            user=self.user, title='Curry', time_minutes=40,
+        )
+        self.curry.tags.add(self.vegan)
+        self.curry.ingredients.add(self.salt)
+        self.salad = create_receipe(
+            user=self.user, title='Salad', time_minutes=5,
+        )
+        self.salad.tags.add(self.vegan, self.quick)
+        self.salad.ingredients.add(self.salt)
+
+        other = create_receipe(user=create_user(email='other@example.com'))
+        other.tags.add(self.vegan)
+
+    def _counts(self, facets):
+        return [(facet['name'], facet['count']) for facet in facets]
+
+    def test_facets(self):
+        """Test counting receipes per tag and ingredient."""
+        with self.assertNumQueries(2):
+            res = self.client.get(FACETS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            self._counts(res.data['tags']),
+            [('Vegan', 2), ('Quick', 1)],
+        )
+        self.assertEqual(res.data['tags'][0]['id'], self.vegan.id)
+        self.assertEqual(
+            self._counts(res.data['ingredients']),
+            [('Salt', 2)],
+        )
+
+    def test_facets_token_auth(self):
+        """Test facets stay within their query budget with a real token."""
+        token = Token.objects.create(user=self.user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        with self.assertNumQueries(3):
+            res = client.get(FACETS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self._counts(res.data['ingredients']), [('Salt', 2)])
+
+    def test_facets_follow_filters(self):
+        """Test counts only cover receipes matching the list filters."""
+        res = self.client.get(FACETS_URL, {'tags': str(self.quick.id)})
+        self.assertEqual(
+            self._counts(res.data['tags']),
+            [('Quick', 1), ('Vegan', 1)],
+        )
+
+        res = self.client.get(FACETS_URL, {'time_minutes__gte': '30'})
+        self.assertEqual(self._counts(res.data['tags']), [('Vegan', 1)])
+
+        res = self.client.get(FACETS_URL, {'search': 'salad'})
+        self.assertEqual(self._counts(res.data['ingredients']), [('Salt', 1)])
+
+    def test_facets_invalid_filter(self):
+        """Test invalid filters are rejected."""
+        res = self.client.get(FACETS_URL, {'price__lte': 'cheap'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_facets_empty(self):
+        """Test counts when no receipe matches."""
+        res = self.client.get(FACETS_URL, {'time_minutes__gte': '100'})
+
+        self.assertEqual(res.data, {'tags': [], 'ingredients': []})
+
+
+class SimilarTests(TestCase):
+    """Test listing similar receipes."""
+
+    def setUp(self):
+        cache.clear()
+        similarity._indexes.clear()
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='test123')
+        self.client.force_authenticate(self.user)
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        rice = Ingredient.objects.create(user=self.user, name='Rice')
+        tofu = Ingredient.objects.create(user=self.user, name='Tofu')
+
+        self.curry = create_receipe(user=self.user, title='Curry')
+        self.curry.tags.add(vegan)
+        self.curry.ingredients.add(rice, tofu)
+        self.bowl = create_receipe(user=self.user, title='Bowl')
+        self.bowl.ingredients.add(rice, tofu)
+        self.risotto = create_receipe(user=self.user, title='Risotto')
+        self.risotto.ingredients.add(rice)
+        create_receipe(user=self.user, title='Toast')
+
+        other = create_receipe(user=create_user(email='other@example.com'))
+        other.ingredients.add(
+            Ingredient.objects.create(user=other.user, name='Rice'),
+        )
+        self.other = other
+
+    def test_similar(self):
+        """Test similar receipes ranked by shared tags and ingredients."""
+        res = self.client.get(similar_url(self.curry.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(item['title'], item['similarity']) for item in res.data],
+            [('Bowl', 2 / 3), ('Risotto', 1 / 3)],
+        )
+        self.assertEqual(
+            res.data[0]['ingredients'],
+            ReceipeSerializer(self.bowl).data['ingredients'],
+        )
+
+    def test_similar_limit(self):
+        """Test ?limit= caps the number of similar receipes."""
+        res = self.client.get(similar_url(self.curry.id), {'limit': 1})
+        self.assertEqual([item['id'] for item in res.data], [self.bowl.id])
+
+        for limit in ['0', 'all', '51']:
+            res = self.client.get(similar_url(self.curry.id), {'limit': limit})
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_similar_other_user_receipe(self):
+        """Test similar receipes of another user's receipe are not found."""
+        res = self.client.get(similar_url(self.other.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_similar_follows_created_receipes(self):
+        """Test receipes created through the API are indexed."""
+        self.client.get(similar_url(self.curry.id))
+        index = similarity._indexes[self.user.id]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(RECEIPES_URL, {
+                'title': 'Tofu Stir Fry',
+                'time_minutes': 10,
+                'price': Decimal('4.00'),
+                'tags': [{'name': 'Vegan'}],
+                'ingredients': [{'name': 'Tofu'}, {'name': 'Rice'}],
+            }, format='json')
+        res = self.client.get(similar_url(self.curry.id), {'limit': 1})
+
+        self.assertIs(similarity._indexes[self.user.id], index)
+        self.assertEqual(res.data[0]['title'], 'Tofu Stir Fry')
+        self.assertEqual(res.data[0]['similarity'], 1.0)
+
+    def test_similar_after_bulk_create(self):
+        """Test receipes created in bulk are indexed."""
+        self.client.get(similar_url(self.curry.id))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(BULK_URL, [{
+                'title': 'Tofu Bowl',
+                'time_minutes': 10,
+                'price': Decimal('4.00'),
+                'tags': [{'name': 'Vegan'}],
+                'ingredients': [{'name': 'Tofu'}, {'name': 'Rice'}],
+            }], format='json')
+        res = self.client.get(similar_url(self.curry.id), {'limit': 1})
+
+        self.assertEqual(res.data[0]['title'], 'Tofu Bowl')
 
 
 class ImageUploadTests(TestCase):
@@ -461,3 +1613,27 @@ class ImageUploadTests(TestCase):
         res = self.client.post(url, payload, format='multipart')
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_upload_image_retry_replayed(self):
+        """Test retrying an upload with the same key keeps the first image."""
+        cache.clear()
+        url = image_upload_url(self.receipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+            img = Image.new('RGB', (10, 10))
+            img.save(image_file, format='JPEG')
+            responses = []
+            for _ in range(2):
+                image_file.seek(0)
+                responses.append(self.client.post(
+                    url,
+                    {'image': image_file},
+                    format='multipart',
+                    HTTP_IDEMPOTENCY_KEY='upload-1',
+                ))
+
+        first, retry = responses
+        self.assertEqual(retry.status_code, status.HTTP_200_OK)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.receipe.refresh_from_db()
+        self.assertTrue(first.data['image'].endswith(self.receipe.image.name))
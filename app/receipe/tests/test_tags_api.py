@@ -2,9 +2,13 @@
 Tests for the tags API.
 """
 from decimal import Decimal
+from unittest import skipUnless
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
 from django.urls import reverse
-from django.test import TestCase
+from django.utils.http import http_date
+from django.test import TestCase, override_settings
 
 from rest_framework import status
 from rest_framework.test import APIClient
@@ -46,6 +50,7 @@ class PrivateTagsApiTests(TestCase):
     """Test authenticated API requests."""
 
     def setUp(self):
+        cache.clear()
         self.user = create_user()
         self.client = APIClient()
         self.client.force_authenticate(self.user)
@@ -60,7 +65,7 @@ class PrivateTagsApiTests(TestCase):
         tags = Tag.objects.all().order_by('-name')
         serializer = TagSerializer(tags, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_tags_limited_to_user(self):
         """Test list of tags is limited to authenticated user."""
@@ -71,9 +76,22 @@ class PrivateTagsApiTests(TestCase):
         res = self.client.get(TAGS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], tag.name)
-        self.assertEqual(res.data[0]['id'], tag.id)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], tag.name)
+        self.assertEqual(res.data['results'][0]['id'], tag.id)
+
+    def test_tags_paginated_by_name(self):
+        """Test tags are paged in descending name order."""
+        for name in ['Apple', 'Banana', 'Cherry']:
+            Tag.objects.create(user=self.user, name=name)
+
+        res = self.client.get(TAGS_URL, {'page_size': 2})
+        names = [t['name'] for t in res.data['results']]
+        res = self.client.get(res.data['next'])
+        names.extend(t['name'] for t in res.data['results'])
+
+        self.assertEqual(names, ['Cherry', 'Banana', 'Apple'])
+        self.assertIsNone(res.data['next'])
 
     def test_update_tag(self):
         """
@@ -88,6 +106,19 @@ class PrivateTagsApiTests(TestCase):
         tag.refresh_from_db()
         self.assertEqual(tag.name, payload['name'])
 
+    def test_update_tag_duplicate_name_error(self):
+        """Test renaming to an existing name returns an error."""
+        Tag.objects.create(user=self.user, name='Breakfast')
+        tag = Tag.objects.create(user=self.user, name='Lunch')
+        payload = {'name': 'Breakfast'}
+        url = detail_url(tag.id)
+        res = self.client.patch(url, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('name', res.data)
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, 'Lunch')
+
     def test_delete_tag(self):
         """
         Test Deleting a tag
@@ -116,8 +147,8 @@ class PrivateTagsApiTests(TestCase):
 
         s1 = TagSerializer(tag1)
         s2 = TagSerializer(tag2)
-        self.assertIn(s1.data, res.data)
-        self.assertNotIn(s2.data, res.data)
+        self.assertIn(s1.data, res.data['results'])
+        self.assertNotIn(s2.data, res.data['results'])
 
     def test_filtered_tags_unique(self):
         """Test filtered tags returns a unique list."""
@@ -140,4 +171,114 @@ class PrivateTagsApiTests(TestCase):
 
         res = self.client.get(TAGS_URL, {'assigned_only': 1})
 
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_autocomplete_tags(self):
+        """Test ?q= returns the user's matching tags, prefixes first."""
+        for name in ['Dinner', 'Weekday Dinner', 'Dessert', 'Dim Sum']:
+            Tag.objects.create(user=self.user, name=name)
+        Tag.objects.create(user=create_user('other@example.com'), name='Din')
+
+        res = self.client.get(TAGS_URL, {'q': 'din'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        names = [tag['name'] for tag in res.data['results']]
+        self.assertEqual(names[0], 'Dinner')
+        self.assertIn('Weekday Dinner', names)
+        self.assertNotIn('Dessert', names)
+        self.assertNotIn('Din', names)
+        self.assertIsNone(res.data['next'])
+
+    @override_settings(AUTOCOMPLETE_MAX_RESULTS=2)
+    def test_autocomplete_tags_limited(self):
+        """Test ?q= returns at most the configured number of tags."""
+        for i in range(5):
+            Tag.objects.create(user=self.user, name=f'Vegan {i}')
+
+        res = self.client.get(TAGS_URL, {'q': 'vegan', 'page_size': 4})
+
+        self.assertEqual(
+            [tag['name'] for tag in res.data['results']],
+            ['Vegan 0', 'Vegan 1'],
+        )
+
+    @skipUnless(connection.vendor == 'postgresql', 'Needs pg_trgm')
+    def test_autocomplete_tags_fuzzy(self):
+        """Test ?q= also matches misspelt names."""
+        Tag.objects.create(user=self.user, name='Breakfast')
+
+        res = self.client.get(TAGS_URL, {'q': 'brekfast'})
+
+        self.assertEqual(res.data['results'][0]['name'], 'Breakfast')
+
+    def test_tags_recipe_count(self):
+        """Test ?recipe_count=1 returns the receipes using each tag."""
+        tag1 = Tag.objects.create(user=self.user, name='Breakfast')
+        tag2 = Tag.objects.create(user=self.user, name='Lunch')
+        for title in ['Pancakes', 'Porridge']:
+            receipe = Receipe.objects.create(
+                title=title,
+                time_minutes=5,
+                price=Decimal('2.00'),
+                user=self.user,
+            )
+            receipe.tags.add(tag1)
+
+        with self.assertNumQueries(2):
+            res = self.client.get(TAGS_URL, {'recipe_count': 1})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], [
+            {'id': tag2.id, 'name': 'Lunch', 'recipe_count': 0},
+            {'id': tag1.id, 'name': 'Breakfast', 'recipe_count': 2},
+        ])
+
+        res = self.client.get(TAGS_URL)
+        self.assertNotIn('recipe_count', res.data['results'][0])
+
+    def test_tags_recipe_count_etag(self):
+        """Test linking a receipe changes the ETag of counted tags."""
+        tag = Tag.objects.create(user=self.user, name='Breakfast')
+        receipe = Receipe.objects.create(
+            title='Pancakes',
+            time_minutes=5,
+            price=Decimal('2.00'),
+            user=self.user,
+        )
+        res = self.client.get(TAGS_URL, {'recipe_count': 1})
+        etag = res['ETag']
+        self.assertFalse(res.has_header('Last-Modified'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            receipe.tags.add(tag)
+        res = self.client.get(
+            TAGS_URL, {'recipe_count': 1}, HTTP_IF_NONE_MATCH=etag,
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'][0]['recipe_count'], 1)
+
+    def test_assigned_tags_if_modified_since_after_unlink(self):
+        """Test If-Modified-Since alone never hides an unassigned tag."""
+        tag = Tag.objects.create(user=self.user, name='Breakfast')
+        kept = Tag.objects.create(user=self.user, name='Sweet')
+        receipe = Receipe.objects.create(
+            title='Pancakes',
+            time_minutes=5,
+            price=Decimal('2.00'),
+            user=self.user,
+        )
+        receipe.tags.add(tag, kept)
+        self.client.get(TAGS_URL, {'assigned_only': 1})
+        since = http_date(kept.modified_at.timestamp() + 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            receipe.tags.remove(tag)
+        res = self.client.get(
+            TAGS_URL, {'assigned_only': 1}, HTTP_IF_MODIFIED_SINCE=since,
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item['name'] for item in res.data['results']], ['Sweet'],
+        )
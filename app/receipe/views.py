@@ -1,6 +1,11 @@
 """
 Views for Receipe APIs
 """
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
 from drf_spectacular.utils import (
     extend_schema_view,
     extend_schema,
@@ -10,64 +15,242 @@ from drf_spectacular.utils import (
 
 from rest_framework import viewsets, mixins, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 
-from core.models import Receipe, Tag, Ingredient
+from batch.authentication import BatchTokenAuthentication
+from core import similarity
+from core.models import DeletionJob, Receipe, Tag, Ingredient
+from core.conditional_get import (
+    ConditionalListMixin,
+    ConditionalRetrieveMixin,
+)
+from core.idempotency import IDEMPOTENCY_PARAMETER, idempotent
+from core.query_budget import QueryBudgetMixin
+from core.renderers import CSVRenderer, NDJSONRenderer
+from core.response_cache import CachedListMixin, get_generation
+from core.transactions import CommitCountMixin
 from receipe import serializers
+from receipe.export import stream_csv, stream_ndjson
+from receipe.filters import (
+    MATCH_MODES,
+    ORDERING_CHOICES,
+    RANGE_FIELDS,
+    RANGE_LOOKUPS,
+    RECEIPE_RELATIONS,
+    annotate_receipe_count,
+    autocomplete_names,
+    facet_counts,
+    filter_assigned,
+    filter_receipe_ranges,
+    filter_receipes_by,
+    parse_match_mode,
+    parse_ordering,
+    search_receipes,
+)
+from receipe.pagination import (
+    ReceipeCursorPagination,
+    RecipeAttrCursorPagination,
+)
+from user.serializers import DeletionJobSerializer
+
+
+SPARSE_FIELDSET_PARAMETERS = [
+    OpenApiParameter(
+        'fields',
+        OpenApiTypes.STR,
+        description='Comma Seperated list of fields to return',
+    ),
+    OpenApiParameter(
+        'expand',
+        OpenApiTypes.STR,
+        description='Comma Seperated list of nested relations to return '
+                    '(tags, ingredients)',
+    ),
+]
+
+RECEIPE_FILTER_PARAMETERS = [
+    OpenApiParameter(
+        'tags',
+        OpenApiTypes.STR,
+        description='Comma Seperated List of tag IDs to filter',
+    ),
+    OpenApiParameter(
+        'tags_mode',
+        OpenApiTypes.STR, enum=MATCH_MODES,
+        description='Match receipes with any (default) or all tags.',
+    ),
+    OpenApiParameter(
+        'ingredients',
+        OpenApiTypes.STR,
+        description='Comma Seperated list of Ingredients to filter',
+    ),
+    OpenApiParameter(
+        'ingredients_mode',
+        OpenApiTypes.STR, enum=MATCH_MODES,
+        description='Match receipes with any (default) or all '
+                    'ingredients.',
+    ),
+    OpenApiParameter(
+        'search',
+        OpenApiTypes.STR,
+        description='Full text search over titles and descriptions, '
+                    'results ordered by relevance',
+    ),
+] + [
+    OpenApiParameter(
+        f'{field}__{lookup}',
+        OpenApiTypes.NUMBER,
+        description=f'Only receipes with {field} '
+                    f'{"at least" if lookup == "gte" else "at most"} '
+                    'this value',
+    )
+    for field in RANGE_FIELDS for lookup in RANGE_LOOKUPS
+] + [
+    OpenApiParameter(
+        'ordering',
+        OpenApiTypes.STR, enum=ORDERING_CHOICES,
+        description='Sort order, - for descending. Defaults to newest '
+                    'first, or relevance when searching.',
+    ),
+]
 
 
 @extend_schema_view(
     list=extend_schema(
-        parameters=[
-            OpenApiParameter(
-                'tags',
-                OpenApiTypes.STR,
-                description='Comma Seperated List of tag IDs to filter',
-            ),
-            OpenApiParameter(
-                'ingredients',
-                OpenApiTypes.STR,
-                description='Comma Seperated list of Ingredients to filter',
-            )
-        ]
-    )
+        parameters=SPARSE_FIELDSET_PARAMETERS + RECEIPE_FILTER_PARAMETERS,
+    ),
+    retrieve=extend_schema(parameters=SPARSE_FIELDSET_PARAMETERS),
+    create=extend_schema(parameters=[IDEMPOTENCY_PARAMETER]),
 )
-class ReceipeViewSet(viewsets.ModelViewSet):
+class ReceipeViewSet(CommitCountMixin,
+                     QueryBudgetMixin,
+                     CachedListMixin,
+                     ConditionalListMixin,
+                     ConditionalRetrieveMixin,
+                     viewsets.ModelViewSet):
     """
     View for Manage Receipe APIs
     """
     serializer_class = serializers.ReceipeDetailSerializer
     queryset = Receipe.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [BatchTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = ReceipeCursorPagination
+    query_budget = {'list': 5, 'retrieve': 5, 'facets': 3}
 
-    def _params_to_ints(self, qs):
+    def _params_to_ints(self, qs, name):
         """
         Convert a list of string to integers
         """
-        return [int(str_id) for str_id in qs.split(',')]
+        try:
+            return [int(str_id) for str_id in qs.split(',')]
+        except ValueError:
+            raise ValidationError(
+                {name: 'Expected a comma separated list of ids.'}
+            )
+
+    def _params_to_names(self, qs):
+        """
+        Convert a comma separated string to a set of names
+        """
+        return {name.strip() for name in qs.split(',') if name.strip()}
+
+    def _requested_fields(self):
+        """
+        Return the serializer fields selected by ?fields= and ?expand=
+        """
+        serializer_class = self.get_serializer_class()
+        available = serializer_class.Meta.fields
+        expandable = serializer_class.expandable_fields
+
+        params = self.request.query_params
+        fields = self._params_to_names(params.get('fields', ''))
+        expand = self._params_to_names(params.get('expand', ''))
+        if not fields and not expand:
+            return list(available)
+
+        return [
+            name for name in available
+            if name == 'id'
+            or (name in expandable and name in fields | expand)
+            or (name not in expandable and (not fields or name in fields))
+        ]
 
     def get_queryset(self):
         """
         Retrieve Receipe for authenticated users
         """
-        tags = self.request.query_params.get('tags')
-        ingredients = self.request.query_params.get('ingredients')
+        params = self.request.query_params
+        tags = params.get('tags')
+        ingredients = params.get('ingredients')
 
         queryset = self.queryset
 
         if tags:
-            tags_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tags_ids)
+            tags_ids = self._params_to_ints(tags, 'tags')
+            queryset = filter_receipes_by(
+                queryset, Tag, tags_ids,
+                mode=parse_match_mode(params, 'tags_mode'),
+            )
         if ingredients:
-            ingredients_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredients_ids)
+            ingredients_ids = self._params_to_ints(ingredients, 'ingredients')
+            queryset = filter_receipes_by(
+                queryset, Ingredient, ingredients_ids,
+                mode=parse_match_mode(params, 'ingredients_mode'),
+            )
 
-        return queryset.filter(
+        queryset = filter_receipe_ranges(queryset, params)
+
+        search = self._search_text()
+        if search:
+            queryset = search_receipes(queryset, search)
+
+        ordering = self.get_pagination_ordering() or ('-id',)
+        queryset = queryset.filter(
             user=self.request.user
-            ).order_by('-id').distinct()
+            ).order_by(*ordering)
+
+        if self.action not in ('list', 'retrieve'):
+            return queryset.prefetch_related('tags', 'ingredients')
+
+        fields = self._requested_fields()
+        value_fields = serializers.ReceipeListFastSerializer.value_fields(
+            fields
+        )
+        # Read by the paginator to build cursors.
+        value_fields += [
+            field.lstrip('-') for field in ordering
+            if field.lstrip('-') not in value_fields
+        ]
+        if self._use_fast_list():
+            return queryset.values(*value_fields)
+
+        return queryset.only(*[
+            field for field in value_fields if field != 'search_rank'
+        ]).prefetch_related(*[
+            Prefetch(name, queryset=model.objects.only(
+                'id', 'name',
+            ).order_by('id'))
+            for name, model in [('tags', Tag), ('ingredients', Ingredient)]
+            if name in fields
+        ])
+
+    def _search_text(self):
+        """
+        Return the ?search= text, if any
+        """
+        return self.request.query_params.get('search', '').strip()
+
+    def get_pagination_ordering(self):
+        """
+        Return the ?ordering= sort order, or relevance when searching
+        """
+        ordering = parse_ordering(self.request.query_params)
+        if ordering is None and self._search_text():
+            return ('-search_rank', '-id')
+        return ordering
 
     def get_serializer_class(self):
         """
@@ -80,13 +263,178 @@ class ReceipeViewSet(viewsets.ModelViewSet):
 
         return self.serializer_class
 
+    def _use_fast_list(self):
+        """
+        Return whether the list is rendered through the fast path
+        """
+        return self.action == 'list' and settings.RECEIPE_FAST_LIST
+
+    def get_serializer(self, *args, **kwargs):
+        """
+        Return the serializer restricted to the requested fields on reads
+        """
+        if self.action in ('list', 'retrieve'):
+            kwargs.setdefault('fields', self._requested_fields())
+        if self._use_fast_list():
+            return serializers.ReceipeListFastSerializer(*args, **kwargs)
+        return super().get_serializer(*args, **kwargs)
+
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        """
+        Create a receipe once per Idempotency-Key
+        """
+        return super().create(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         """
         Create a new receipe
         """
         serializer.save(user=self.request.user)
 
+    @extend_schema(
+        parameters=RECEIPE_FILTER_PARAMETERS,
+        responses={(200, 'application/x-ndjson'): OpenApiTypes.STR,
+                   (200, 'text/csv'): OpenApiTypes.STR},
+    )
+    @action(
+        methods=['GET'],
+        detail=False,
+        renderer_classes=[NDJSONRenderer, CSVRenderer],
+    )
+    def export(self, request):
+        """Stream all receipes as NDJSON, or CSV with ?format=csv."""
+        queryset = self.filter_queryset(self.get_queryset())
+        renderer = request.accepted_renderer
+        if renderer.format == 'csv':
+            content = stream_csv(queryset)
+        else:
+            content = stream_ndjson(queryset)
+
+        response = StreamingHttpResponse(
+            content,
+            content_type=renderer.media_type,
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="receipes.{renderer.format}"'
+        )
+        return response
+
+    @extend_schema(
+        parameters=[
+            parameter for parameter in RECEIPE_FILTER_PARAMETERS
+            if parameter.name != 'ordering'
+        ],
+        responses=serializers.ReceipeFacetsSerializer,
+    )
+    @action(methods=['GET'], detail=False)
+    def facets(self, request):
+        """Count the filtered receipes carrying each tag and ingredient."""
+        receipes = self.get_queryset()
+        serializer = serializers.ReceipeFacetsSerializer({
+            name: facet_counts(receipes, model)
+            for model, name in RECEIPE_RELATIONS.items()
+        })
+
+        return Response(serializer.data)
+
+    @extend_schema(
+        request=serializers.ReceipeDetailSerializer(many=True),
+        responses={201: serializers.ReceipeDetailSerializer(many=True)},
+    )
+    @action(methods=['POST'], detail=False)
+    def bulk(self, request):
+        """Create many receipes from a list of payloads."""
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        receipes = serializer.save(user=request.user)
+
+        queryset = self.get_queryset().filter(
+            id__in=[receipe.id for receipe in receipes],
+        ).order_by('id')
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @extend_schema(
+        request=serializers.ReceipeBulkDeleteSerializer,
+        responses={202: DeletionJobSerializer},
+    )
+    @action(methods=['POST'], detail=False, url_path='bulk-delete')
+    def bulk_delete(self, request):
+        """Schedule the deletion of many receipes in the background."""
+        serializer = serializers.ReceipeBulkDeleteSerializer(
+            data=request.data,
+        )
+        serializer.is_valid(raise_exception=True)
+        job = DeletionJob.objects.create(
+            user=request.user,
+            kind=DeletionJob.KIND_RECEIPES,
+            receipe_ids=sorted(set(serializer.validated_data['ids'])),
+        )
+
+        return Response(
+            DeletionJobSerializer(job).data,
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+    def _similar_limit(self):
+        """
+        Return the ?limit= number of similar receipes to return
+        """
+        value = self.request.query_params.get('limit')
+        if not value:
+            return settings.SIMILAR_RECEIPES_DEFAULT
+        try:
+            limit = int(value)
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= settings.SIMILAR_RECEIPES_MAX:
+            raise ValidationError({'limit': (
+                f'Expected an integer from 1 to '
+                f'{settings.SIMILAR_RECEIPES_MAX}.'
+            )})
+        return limit
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'limit',
+                OpenApiTypes.INT,
+                description='Number of similar receipes to return',
+            ),
+        ],
+        responses=serializers.SimilarReceipeSerializer(many=True),
+    )
+    @action(methods=['GET'], detail=True)
+    def similar(self, request, pk=None):
+        """List the receipes sharing the most tags and ingredients."""
+        receipe = self.get_object()
+        features = similarity.feature_ids(
+            Tag, [tag.id for tag in receipe.tags.all()],
+        ) + similarity.feature_ids(
+            Ingredient, [item.id for item in receipe.ingredients.all()],
+        )
+        matches = similarity.similar_receipes(
+            receipe, features, self._similar_limit(),
+        )
+
+        receipes = self.get_queryset().in_bulk(
+            [receipe_id for receipe_id, _ in matches]
+        )
+        results = []
+        for receipe_id, score in matches:
+            # Skip receipes deleted since the index last heard of them.
+            if receipe_id in receipes:
+                receipes[receipe_id].similarity = score
+                results.append(receipes[receipe_id])
+
+        return Response(
+            serializers.SimilarReceipeSerializer(results, many=True).data
+        )
+
+    @extend_schema(parameters=[IDEMPOTENCY_PARAMETER])
     @action(methods=['POST'], detail=True, url_path='upload-image')
+    @idempotent
     def upload_image(self, request, pk=None):
         """Upload an image to recipe."""
         receipe = self.get_object()
@@ -107,16 +455,33 @@ class ReceipeViewSet(viewsets.ModelViewSet):
                 OpenApiTypes.INT, enum=[0, 1],
                 description='Filter by items assigned to receipes.',
             ),
+            OpenApiParameter(
+                'recipe_count',
+                OpenApiTypes.INT, enum=[0, 1],
+                description='Include the number of receipes using each '
+                            'item.',
+            ),
+            OpenApiParameter(
+                'q',
+                OpenApiTypes.STR,
+                description='Type-ahead match on names, prefix matches '
+                            'first, returning a single short page.',
+            ),
         ]
     )
 )
-class BaseRecipeAttrViewSet(mixins.DestroyModelMixin,
+class BaseRecipeAttrViewSet(QueryBudgetMixin,
+                            CachedListMixin,
+                            ConditionalListMixin,
+                            mixins.DestroyModelMixin,
                             mixins.UpdateModelMixin,
                             mixins.ListModelMixin,
                             viewsets.GenericViewSet):
     """Base viewset for receipe attributes."""
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [BatchTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = RecipeAttrCursorPagination
+    query_budget = {'list': 3}
 
     def get_queryset(self):
         """
@@ -127,10 +492,77 @@ class BaseRecipeAttrViewSet(mixins.DestroyModelMixin,
         )
         queryset = self.queryset
         if assigned_only:
-            queryset = queryset.filter(receipe__isnull=False)
-        return queryset.filter(
+            queryset = filter_assigned(queryset)
+        queryset = queryset.filter(
             user=self.request.user
-            ).order_by('-name').distinct()
+            ).order_by('-name')
+
+        text = self._autocomplete_text()
+        if text:
+            queryset = autocomplete_names(queryset, text)
+        return queryset
+
+    def _autocomplete_text(self):
+        """
+        Return the ?q= text of a list request, if any
+        """
+        if self.action != 'list':
+            return ''
+        return self.request.query_params.get('q', '').strip()
+
+    def _with_recipe_count(self):
+        """
+        Return whether a list request asked for receipe counts
+        """
+        return self.action == 'list' and bool(
+            int(self.request.query_params.get('recipe_count', 0))
+        )
+
+    def get_serializer_class(self):
+        """
+        Return the serializer including receipe counts when requested
+        """
+        if self._with_recipe_count():
+            return self.count_serializer_class
+        return self.serializer_class
+
+    def get_list_validators(self):
+        """
+        Return the list validators, following receipe counts if requested
+        """
+        etag, last_modified = super().get_list_validators()
+        if not self._with_recipe_count():
+            return etag, last_modified
+
+        # Linking receipes leaves modified_at alone but moves the cache
+        # generation on.
+        generation = get_generation(self.request.user.pk)
+        return self._make_etag(etag, generation), last_modified
+
+    def paginate_queryset(self, queryset):
+        """
+        Return the page of items, or the best autocomplete matches as a
+        single page
+        """
+        if self._with_recipe_count():
+            # Annotated here rather than in get_queryset so the counts are
+            # computed for the page only, not for the list validators.
+            queryset = annotate_receipe_count(queryset)
+        if self._autocomplete_text():
+            return list(queryset[:settings.AUTOCOMPLETE_MAX_RESULTS])
+        return super().paginate_queryset(queryset)
+
+    def get_paginated_response(self, data):
+        """
+        Wrap autocomplete matches in the usual envelope, with no other pages
+        """
+        if self._autocomplete_text():
+            return Response(OrderedDict([
+                ('next', None),
+                ('previous', None),
+                ('results', data),
+            ]))
+        return super().get_paginated_response(data)
 
 
 class TagViewSet(BaseRecipeAttrViewSet):
@@ -138,10 +570,12 @@ class TagViewSet(BaseRecipeAttrViewSet):
     Manage Tags in the database
     """
     serializer_class = serializers.TagSerializer
+    count_serializer_class = serializers.TagCountSerializer
     queryset = Tag.objects.all()
 
 
 class IngredientViewSet(BaseRecipeAttrViewSet):
     """Manage ingredients in the database."""
     serializer_class = serializers.IngredientSerializer
+    count_serializer_class = serializers.IngredientCountSerializer
     queryset = Ingredient.objects.all()
@@ -6,6 +6,8 @@ from django.contrib.auth import authenticate
 from django.utils.translation import gettext as _
 from rest_framework import serializers
 
+from core.models import DeletionJob
+
 
 class UserSerializer(serializers.ModelSerializer):
     """Serializer for the user object."""
@@ -63,3 +65,15 @@ class AuthTokenSerializer(serializers.Serializer):
         attrs['user'] = user
 
         return attrs
+
+
+class DeletionJobSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the status of a background deletion job
+    """
+
+    class Meta:
+        model = DeletionJob
+        fields = ['id', 'token', 'kind', 'status', 'deleted', 'created_at',
+                  'finished_at']
+        read_only_fields = fields
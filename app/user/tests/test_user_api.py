@@ -1,13 +1,18 @@
 """
 Tests for user API
 """
+from django.core.cache import cache
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 
+from rest_framework.authtoken.models import Token
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from core.deletion import run_deletion_job
+from core.models import DeletionJob
+
 
 CREATE_USER_URL = reverse('user:create')
 
@@ -16,6 +21,20 @@ TOKEN_URL = reverse('user:token')
 ME_URL = reverse('user:me')
 
 
+def deletion_job_url(job_id):
+    """
+    Create and return a deletion job status URL
+    """
+    return reverse('user:deletion-job', args=[job_id])
+
+
+def deletion_status_url(token):
+    """
+    Create and return a deletion job status URL by token
+    """
+    return reverse('user:deletion-job-status', args=[token])
+
+
 def create_user(**params):
     """
     Create and return a new user
@@ -43,6 +62,26 @@ class PublicUserApiTests(TestCase):
         self.assertTrue(user.check_password(payload['password']))
         self.assertNotIn('password', res.data)
 
+    def test_create_user_retry_with_idempotency_key(self):
+        """Test retrying a sign up with the same key creates one user."""
+        cache.clear()
+        payload = {
+            'email': 'test@example.com',
+            'password': 'testpass123',
+            'name': 'Test Name',
+        }
+        first = self.client.post(
+            CREATE_USER_URL, payload, HTTP_IDEMPOTENCY_KEY='signup-1',
+        )
+        retry = self.client.post(
+            CREATE_USER_URL, payload, HTTP_IDEMPOTENCY_KEY='signup-1',
+        )
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(get_user_model().objects.count(), 1)
+
     def test_user_with_email_exists_error(self):
         """Test error returned if user with email exists."""
         payload = {
@@ -166,3 +205,76 @@ class PrivateUserApiTests(TestCase):
         self.assertEqual(self.user.name, payload['name'])
         self.assertTrue(self.user.check_password(payload['password']))
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_delete_user_schedules_deletion(self):
+        """
+        Test deleting the user deactivates it and returns a deletion job
+        """
+        res = self.client.delete(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        job = DeletionJob.objects.get(id=res.data['id'])
+        self.assertEqual(job.user, self.user)
+        self.assertEqual(job.kind, DeletionJob.KIND_USER)
+        self.assertEqual(res.data['status'], DeletionJob.STATUS_PENDING)
+
+    def test_retrieve_deletion_job(self):
+        """
+        Test retrieving the status of the user's own deletion jobs only
+        """
+        job = DeletionJob.objects.create(
+            user=self.user,
+            kind=DeletionJob.KIND_RECEIPES,
+        )
+        other_job = DeletionJob.objects.create(
+            user=create_user(email='other@example.com', password='test123'),
+            kind=DeletionJob.KIND_RECEIPES,
+        )
+
+        res = self.client.get(deletion_job_url(job.id))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['kind'], DeletionJob.KIND_RECEIPES)
+
+        res = self.client.get(deletion_job_url(other_job.id))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_follow_account_deletion(self):
+        """
+        Test an account deletion can be followed until the user is gone
+        """
+        token = Token.objects.create(user=self.user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        res = client.delete(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        status_url = deletion_status_url(res.data['token'])
+
+        # The deactivated account's token no longer authenticates.
+        res = client.get(deletion_job_url(res.data['id']))
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        res = APIClient().get(status_url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['status'], DeletionJob.STATUS_PENDING)
+
+        run_deletion_job(DeletionJob.objects.get(token=res.data['token']))
+
+        res = APIClient().get(status_url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['status'], DeletionJob.STATUS_DONE)
+        self.assertFalse(
+            get_user_model().objects.filter(id=self.user.id).exists()
+        )
+
+    def test_deletion_status_unknown_token(self):
+        """
+        Test an unknown deletion job token is not found
+        """
+        res = APIClient().get(
+            deletion_status_url('00000000-0000-0000-0000-000000000000')
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
@@ -12,4 +12,14 @@ urlpatterns = [
     path('create/', views.CreateUserView.as_view(), name='create'),
     path('token/', views.CreateTokenView.as_view(), name='token'),
     path('me/', views.ManageUserView.as_view(), name='me'),
+    path(
+        'deletion-jobs/<int:pk>/',
+        views.DeletionJobView.as_view(),
+        name='deletion-job',
+    ),
+    path(
+        'deletion-jobs/<uuid:token>/',
+        views.DeletionJobStatusView.as_view(),
+        name='deletion-job-status',
+    ),
 ]
@@ -1,16 +1,33 @@
 """
 Views for the user API.
 """
-from rest_framework import generics, authentication, permissions
+from django.db import transaction
+from drf_spectacular.utils import extend_schema, extend_schema_view
+from rest_framework import generics, permissions, status
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
-from user.serializers import UserSerializer, AuthTokenSerializer
+
+from batch.authentication import BatchTokenAuthentication
+from core.idempotency import IDEMPOTENCY_PARAMETER, idempotent
+from core.models import DeletionJob
+from user.serializers import (
+    UserSerializer,
+    AuthTokenSerializer,
+    DeletionJobSerializer,
+)
 
 
 class CreateUserView(generics.CreateAPIView):
     """Create a new user in the system."""
     serializer_class = UserSerializer
 
+    @extend_schema(parameters=[IDEMPOTENCY_PARAMETER])
+    @idempotent
+    def post(self, request, *args, **kwargs):
+        """Create a user once per Idempotency-Key."""
+        return super().post(request, *args, **kwargs)
+
 
 class CreateTokenView(ObtainAuthToken):
     """
@@ -25,7 +42,7 @@ class ManageUserView(generics.RetrieveUpdateAPIView):
     Manage the authenticated user
     """
     serializer_class = UserSerializer
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [BatchTokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
@@ -33,3 +50,53 @@ class ManageUserView(generics.RetrieveUpdateAPIView):
         Retrieve and return the authenticated user
         """
         return self.request.user
+
+    @extend_schema(responses={202: DeletionJobSerializer})
+    def delete(self, request, *args, **kwargs):
+        """
+        Deactivate the user and schedule the deletion of their data
+        """
+        user = self.get_object()
+        with transaction.atomic():
+            user.is_active = False
+            user.save(update_fields=['is_active'])
+            job = DeletionJob.objects.create(
+                user=user,
+                kind=DeletionJob.KIND_USER,
+            )
+
+        serializer = DeletionJobSerializer(job)
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+
+class DeletionJobView(generics.RetrieveAPIView):
+    """
+    Show the progress of a deletion job of the authenticated user
+    """
+    serializer_class = DeletionJobSerializer
+    queryset = DeletionJob.objects.all()
+    authentication_classes = [BatchTokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        """
+        Retrieve deletion jobs for the authenticated user
+        """
+        return self.queryset.filter(user=self.request.user)
+
+
+@extend_schema_view(
+    get=extend_schema(operation_id='user_deletion_jobs_status_retrieve'),
+)
+class DeletionJobStatusView(generics.RetrieveAPIView):
+    """
+    Show the progress of a deletion job by its token.
+
+    Needs no credentials, so an account deletion can still be followed
+    once the account is deactivated and, later, removed.
+    """
+    serializer_class = DeletionJobSerializer
+    queryset = DeletionJob.objects.all()
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+    lookup_field = 'token'